@@ -4,18 +4,9 @@ import argparse, os, platform, socket, subprocess, sys
 from contextlib import suppress
 from pathlib import Path
 
-from syncweb import cmd_utils
+from syncweb import cmd_utils, log_utils, server
 from syncweb.cli import STDIN_DASH, ArgparseArgsOrStdin, ArgparseList, SubParser
-from syncweb.cmds.automatic import cmd_automatic
-from syncweb.cmds.devices import cmd_list_devices
-from syncweb.cmds.download import cmd_download
-from syncweb.cmds.find import cmd_find
-from syncweb.cmds.folders import cmd_list_folders
-from syncweb.cmds.ls import cmd_ls
-from syncweb.cmds.sort import cmd_sort
-from syncweb.cmds.stat import cmd_stat
 from syncweb.log_utils import log
-from syncweb.syncweb import Syncweb
 
 __version__ = "0.0.17"
 
@@ -56,6 +47,10 @@ def cmd_join(args):
     print("Local Device ID:", args.st.device_id)
 
 
+def cmd_server(args):
+    server.serve(args, create_parser)
+
+
 def get_hostname():
     ignored = ("localhost", "localhost.localdomain")
 
@@ -82,7 +77,7 @@ def get_hostname():
     return "syncweb"
 
 
-def cli():
+def create_parser():
     parser = argparse.ArgumentParser(prog="syncweb", description="Syncweb: an offline-first distributed web")
     parser.add_argument("--home", type=Path, help="Base directory for syncweb metadata (default: platform-specific)")
     parser.add_argument(
@@ -163,7 +158,10 @@ def cli():
     )
 
     folders = subparsers.add_parser(
-        "folders", aliases=["list-folders", "lsf"], help="List Syncthing folders", func=cmd_list_folders
+        "folders",
+        aliases=["list-folders", "lsf"],
+        help="List Syncthing folders",
+        func="syncweb.cmds.folders:cmd_list_folders",
     )
     folders.add_argument(
         "--discovered",
@@ -221,7 +219,10 @@ def cli():
     folders.add_argument("--print", action="store_true", help="Only print folder ids")
 
     devices = subparsers.add_parser(
-        "devices", aliases=["list-devices", "lsd"], help="List Syncthing devices", func=cmd_list_devices
+        "devices",
+        aliases=["list-devices", "lsd"],
+        help="List Syncthing devices",
+        func="syncweb.cmds.devices:cmd_list_devices",
     )
     devices.add_argument(
         "--xfer", nargs="?", const=5, type=int, default=0, help="Wait to calculate transfer statistics"
@@ -265,7 +266,9 @@ def cli():
     devices.add_argument("--resume", action="store_true", help="Resume (unpause) matching devices")
     devices.add_argument("--print", action="store_true", help="Print only device ids")
 
-    ls = subparsers.add_parser("ls", aliases=["list"], help="List files at the current directory level", func=cmd_ls)
+    ls = subparsers.add_parser(
+        "ls", aliases=["list"], help="List files at the current directory level", func="syncweb.cmds.ls:cmd_ls"
+    )
     ls.add_argument("--long", "-l", action="store_true", help="use long listing format")
     ls.add_argument(
         "--human-readable",
@@ -286,7 +289,10 @@ def cli():
     # TODO: subparsers.add_parser("cd", help="Change directory helper")
 
     find = subparsers.add_parser(
-        "find", aliases=["fd", "search"], help="Search for files by filename, size, and modified date", func=cmd_find
+        "find",
+        aliases=["fd", "search"],
+        help="Search for files by filename, size, and modified date",
+        func="syncweb.cmds.find:cmd_find",
     )
     find.add_argument("--ignore-case", "-i", action="store_true", help="Case insensitive search")
     find.add_argument("--case-sensitive", "-s", action="store_true", help="Case sensitive search")
@@ -362,7 +368,9 @@ def cli():
     find.add_argument("pattern", nargs="?", default=".*", help="Search patterns (default: all files)")
     find.add_argument("search_paths", nargs="*", help="Root directories to search")
 
-    stat = subparsers.add_parser("stat", help="Display detailed file status information from Syncthing", func=cmd_stat)
+    stat = subparsers.add_parser(
+        "stat", help="Display detailed file status information from Syncthing", func="syncweb.cmds.stat:cmd_stat"
+    )
     stat.add_argument("--terse", "-t", action="store_true", help="Print information in terse form")
     stat.add_argument(
         "--format",
@@ -378,7 +386,9 @@ def cli():
     )
     stat.add_argument("paths", nargs="+", help="Files or directories to stat")
 
-    sort = subparsers.add_parser("sort", help="Sort Syncthing files by multiple criteria", func=cmd_sort)
+    sort = subparsers.add_parser(
+        "sort", help="Sort Syncthing files by multiple criteria", func="syncweb.cmds.sort:cmd_sort"
+    )
     sort.add_argument(
         "--sort",
         "--sort-by",
@@ -436,16 +446,38 @@ for example `--sort=date,-seeds` means old and popular
     )
     sort.add_argument("--min-depth", type=int, default=0, metavar="N", help="Alternative depth notation")
     sort.add_argument("--max-depth", type=int, default=None, metavar="N", help="Alternative depth notation")
+    sort.add_argument(
+        "--exact-median",
+        action="store_true",
+        help="Compute folder-date and folder-size medians exactly instead of estimating them in constant memory",
+    )
     sort.add_argument("paths", nargs="*", default=STDIN_DASH, action=ArgparseArgsOrStdin, help="File paths to sort")
 
     download = subparsers.add_parser(
         "download",
         aliases=["dl", "upload", "unignore", "sync"],
         help="Mark file paths for download/sync",
-        func=cmd_download,
+        func="syncweb.cmds.download:cmd_download",
     )
     download.add_argument("--no-confirm", "--yes", "-y", action="store_true")
     download.add_argument("--depth", type=int, help="Maximum depth for directory traversal")
+    download.add_argument(
+        "--schedule",
+        action="store_true",
+        help="Keep running and release files in batches which fit the free space as downloads finish",
+    )
+    download.add_argument(
+        "--in-flight",
+        metavar="SIZE",
+        help="With --schedule: maximum bytes waiting to be downloaded at once (eg. 20GB)",
+    )
+    download.add_argument(
+        "--prioritize",
+        default=0,
+        type=int,
+        metavar="N",
+        help="Keep running and move the next N files (eg. 10) of each folder to the front of the download queue, in input order",
+    )
     download.add_argument(
         "paths",
         nargs="*",
@@ -454,7 +486,9 @@ for example `--sort=date,-seeds` means old and popular
         help="File or directory paths to download (or read from stdin)",
     )
 
-    automatic = subparsers.add_parser("automatic", help="Start syncweb-automatic daemon", func=cmd_automatic)
+    automatic = subparsers.add_parser(
+        "automatic", help="Start syncweb-automatic daemon", func="syncweb.cmds.automatic:cmd_automatic"
+    )
     automatic.add_argument(
         "--global",
         dest="non_local",
@@ -512,13 +546,42 @@ for example `--sort=date,-seeds` means old and popular
 
     subparsers.add_parser("shutdown", help="Shut down Syncweb", aliases=["stop", "quit"], func=cmd_shutdown)
     subparsers.add_parser("start", help="Start Syncweb", aliases=["restart"], func=cmd_start)
+    subparsers.add_parser(
+        "server", aliases=["serve"], help="Keep Syncweb running to answer other commands quickly", func=cmd_server
+    )
 
     subparsers.add_parser("repl", help="Talk to Syncthing API", func=lambda a: (self := a.st) and breakpoint())
     subparsers.add_parser("version", help="Show Syncweb version", func=cmd_version)
     subparsers.add_parser("help", help="Show this help message", func=lambda _: subparsers.print_help())
+    return subparsers
+
+
+def forward_to_server(subparsers, argv):
+    cmd_index = subparsers.command_index(argv)
+    if cmd_index is None or any(s in ("-h", "--help") for s in argv):
+        return None
+    cmd = subparsers.subcommands.get(argv[cmd_index])
+    if cmd is None or server.is_local_only(cmd.name, argv[cmd_index + 1 :]):
+        return None
+
+    known, _unknown = subparsers.parser.parse_known_args(argv)
+    if known.verbose and log_utils.is_terminal and not known.no_pdb:
+        return None  # the post-mortem debugger needs to run in this process
+
+    home = known.home or cmd_utils.default_state_dir("syncweb")
+    return server.forward(home, argv)
+
+
+def cli():
+    subparsers = create_parser()
+    exit_code = forward_to_server(subparsers, sys.argv[1:])
+    if exit_code is not None:
+        sys.exit(exit_code)
 
     args = subparsers.parse()
 
+    from syncweb.syncweb import Syncweb
+
     log.info("Syncweb v%s :: %s", __version__, os.path.realpath(sys.path[0]))
     if args.home is None:
         args.home = cmd_utils.default_state_dir("syncweb")
@@ -1,4 +1,4 @@
-import argparse, json, shlex, sys, textwrap
+import argparse, importlib, json, shlex, sys, textwrap
 from itertools import zip_longest
 from typing import Any, Callable, Dict, List, Optional
 
@@ -9,6 +9,14 @@ from syncweb.str_utils import flatten, safe_len
 STDIN_DASH = ["-"]
 
 
+def resolve_func(func):
+    # "package.module:function" strings are imported only when the subcommand runs
+    if isinstance(func, str):
+        module_name, func_name = func.split(":")
+        return getattr(importlib.import_module(module_name), func_name)
+    return func
+
+
 class ArgparseList(argparse.Action):
     def __call__(self, parser, namespace, values, option_string=None):
         items = getattr(namespace, self.dest, None) or []
@@ -41,7 +49,7 @@ class Subcommand:
         name: str,
         help: str = "",
         aliases: Optional[List[str]] = None,
-        func: Optional[Callable[[argparse.Namespace], Any]] = None,
+        func: Optional[Callable[[argparse.Namespace], Any] | str] = None,
         formatter_class=None,
     ):
         self.name = name
@@ -256,7 +264,7 @@ class SubParser:
         *,
         help: str = "",
         aliases: Optional[List[str]] = None,
-        func: Optional[Callable[[argparse.Namespace], Any]] = None,
+        func: Optional[Callable[[argparse.Namespace], Any] | str] = None,
     ) -> Subcommand:
         cmd = Subcommand(name, help, aliases, func, formatter_class=self.formatter_class)
         for n in cmd.all_names:
@@ -279,7 +287,7 @@ class SubParser:
             print(self.version)
             sys.exit(0)
 
-        cmd_index = next((i for i, arg in enumerate(argv) if not arg.startswith("-")), None)
+        cmd_index = self.command_index(argv)
         if cmd_index is None:
             self.error("No command provided")
         cmd_name = argv[cmd_index]
@@ -335,11 +343,25 @@ class SubParser:
 
         def run():
             if cmd.func:
-                return cmd.func(args)
+                return resolve_func(cmd.func)(args)
 
+        args.command = cmd.name
         args.run = run
         return args
 
+    def command_index(self, argv: List[str]) -> Optional[int]:
+        """Position of the subcommand in argv, skipping the values of global options like --home"""
+        i = 0
+        while i < len(argv):
+            arg = argv[i]
+            if not arg.startswith("-"):
+                return i
+            action = self.parser._option_string_actions.get(arg)
+            if action is not None and action.nargs != 0:
+                i += 1  # the option's value is the next argument
+            i += 1
+        return None
+
     def print_help(self):
         print(f"{self.parser.description or ''}\n")
         print("Available commands:")
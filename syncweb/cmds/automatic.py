@@ -1,13 +1,31 @@
 #!/usr/bin/env python3
-import argparse, signal, subprocess, sys
+import os, signal, subprocess, sys, threading, time
 from threading import Event
 
+from syncweb.log_utils import log
+
 shutdown = Event()
+wake = Event()
+
+STEPS = ("devices", "folders", "files")
+WAKE_EVENTS = {
+    "PendingDevicesChanged": "devices",
+    "DeviceDiscovered": "devices",
+    "PendingFoldersChanged": "folders",
+    "FolderSummary": "files",
+    "ItemFinished": "files",
+}
+MIN_IDLE = 5
+MAX_IDLE = 300
+DEBOUNCED = {"files"}  # steps which Syncthing wakes often while it is busy; devices and folders run at once
+MIN_INTERVAL = 30  # event-driven runs of the files step are at least this many seconds apart
+MUTE = 60  # seconds to ignore folder events caused by the loop's own ignore writes
 
 
 def handle_signal(signum, frame):
     print(f"[syncweb-daemon] received signal {signum}, shutting down", file=sys.stderr)
     shutdown.set()
+    wake.set()
 
 
 def run(cmd, *, stdin=None, capture_output=False):
@@ -17,11 +35,153 @@ def run(cmd, *, stdin=None, capture_output=False):
     return subprocess.run(cmd, input=stdin, capture_output=capture_output, text=True, check=False)
 
 
-def get_download_paths():
+class Wakeups:
+    """Long-polls /rest/events in a background thread and collects which steps of the loop have new work
+
+    This is a separate subscription from the index's EventWatcher so it does not change the event IDs that
+    the index persists. Device and folder events wake the loop immediately. Events for the files step are
+    coalesced until min_interval has passed since it last ran, and are dropped for folders that the loop
+    itself just wrote ignores to (see mute).
     """
-    Equivalent to: grep -Fv -f <(syncweb-blocklist.sh) <(syncweb-wishlist.sh)
+
+    def __init__(self, st, timeout=60, min_interval=MIN_INTERVAL):
+        self.st = st
+        self.timeout = timeout
+        self.min_interval = min_interval
+        self.lock = threading.Lock()
+        self.steps: set[str] = set()
+        self.muted: dict[str, float] = {}  # folder_id -> monotonic time until which its events are ignored
+        self.not_before = 0.0
+        self.since: int | None = None
+        self.thread: threading.Thread | None = None
+
+    def mute(self, folder_ids, seconds=MUTE):
+        until = time.monotonic() + seconds
+        with self.lock:
+            for folder_id in folder_ids:
+                self.muted[folder_id] = until
+
+    def ran(self, steps):
+        if steps & DEBOUNCED:
+            with self.lock:
+                self.not_before = time.monotonic() + self.min_interval
+
+    def notify(self, events):
+        now = time.monotonic()
+        steps = set()
+        for e in events:
+            step = WAKE_EVENTS.get(e.get("type"))
+            folder_id = (e.get("data") or {}).get("folder")
+            if step in DEBOUNCED and folder_id and self.muted.get(folder_id, 0) > now:
+                continue
+            if step:
+                steps.add(step)
+        if steps:
+            with self.lock:
+                self.steps |= steps
+                wake.set()
+
+    def poll(self, timeout):
+        event_types = list(WAKE_EVENTS)
+        if self.since is None:
+            # start from the newest event instead of replaying Syncthing's whole buffer
+            latest = self.st.events(since=0, limit=1, timeout=0, event_types=event_types)
+            self.since = latest[-1]["id"] if latest else 0
+        events = self.st.events(since=self.since, timeout=timeout, event_types=event_types)
+        if events:
+            self.since = events[-1]["id"]
+        return events
+
+    def run(self):
+        delay = 1
+        while not shutdown.is_set():
+            try:
+                events = self.poll(self.timeout)
+                delay = 1
+            except Exception as e:
+                log.debug("Error polling events %s", e)
+                if shutdown.wait(delay):
+                    break
+                delay = min(delay * 2, 60)
+                continue
+            self.notify(events)
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name="syncweb-wakeups", daemon=True)
+        self.thread.start()
+        return self.thread
+
+    def wait(self, timeout) -> set[str]:
+        """Block until an event wakes some steps; returns an empty set on timeout or shutdown"""
+        deadline = time.monotonic() + timeout
+        while not shutdown.is_set():
+            with self.lock:
+                now = time.monotonic()
+                ready = set(self.steps) if now >= self.not_before else self.steps - DEBOUNCED
+                if ready:
+                    self.steps -= ready
+                    return ready
+                wake.clear()
+                remaining = deadline - now
+                if self.steps:
+                    remaining = min(remaining, self.not_before - now)
+            if now >= deadline:
+                break
+            wake.wait(remaining)
+
+        with self.lock:
+            self.steps = set()  # the caller re-checks everything after a timeout
+        return set()
+
+
+def parse_command(args, argv):
+    # imported here: syncweb.__main__ lazily imports this module
+    from syncweb.__main__ import create_parser
+
+    # a fresh parser every time because ArgparseList extends its default lists in place
+    command_args = create_parser().parse(argv)
+    command_args.st = args.st
+    return command_args
+
+
+def run_command(args, argv, func=None):
+    """Run a syncweb subcommand in this process, sharing args.st and its caches
+
+    Errors are reported and swallowed so that one failing step does not stop the daemon
     """
+    if shutdown.is_set():
+        return None
+
+    try:
+        command_args = parse_command(args, argv)
+        return func(command_args) if func else command_args.run()
+    except SystemExit as e:
+        if e.code not in (None, 0):
+            print(f"[syncweb-daemon] {argv[0]} exited with {e.code}", file=sys.stderr)
+    except Exception as e:
+        print(f"[syncweb-daemon] {argv[0]} failed: {e}", file=sys.stderr)
+    return None
+
+
+def succeeds(command_args) -> bool:
+    """Run a parsed command for run_command, returning True unless it fails"""
     try:
+        command_args.run()
+    except SystemExit as e:
+        if e.code not in (None, 0):
+            raise
+    return True
+
+
+def get_download_paths(wishlist=None):
+    """
+    New matches of the wishlist queries in the state dir, or if there are none
+    the equivalent of: grep -Fv -f <(syncweb-blocklist.sh) <(syncweb-wishlist.sh)
+    """
+    try:
+        if wishlist is not None and wishlist.exists():
+            return wishlist.update()
+
         blocklist = run(["syncweb-blocklist.sh"], capture_output=True).stdout.splitlines()  # type: ignore
         wishlist = run(["syncweb-wishlist.sh"], capture_output=True).stdout.splitlines()  # type: ignore
 
@@ -34,67 +194,77 @@ def get_download_paths():
 
 
 def syncweb_automatic(args):
-    SLEEP_ACCEPT = 5
-    SLEEP_JOIN = 10
+    from syncweb.cmds.sort import sort_paths
+    from syncweb.wishlist import Wishlist
 
+    wishlist = Wishlist(args.st, lambda argv: parse_command(args, argv))
+    wakeups = Wakeups(args.st)
+    wakeups.start()
+
+    steps = set(STEPS)
+    idle = MIN_IDLE
     while not shutdown.is_set():
         # 1. Devices
-        devices_cmd = ["syncweb", "devices", "--pending", "--accept"]
+        devices_cmd = ["devices", "--pending", "--accept"]
         if not args.non_local:
             devices_cmd.append("--local-only")
-        if args.folders_include:
-            devices_cmd.extend(["--include", ",".join(args.folders_include)])
-        if args.folders_exclude:
-            devices_cmd.extend(["--exclude", ",".join(args.folders_exclude)])
+        if args.devices_include:
+            devices_cmd.extend(["--include", ",".join(args.devices_include)])
+        if args.devices_exclude:
+            devices_cmd.extend(["--exclude", ",".join(args.devices_exclude)])
         # Actions
         if args.devices:
             devices_cmd.append("--discovered")
 
-        run(devices_cmd)
-        if shutdown.wait(SLEEP_ACCEPT):
-            break
+        if "devices" in steps:
+            run_command(args, devices_cmd)
 
         # 2. Folders
-        folders_cmd = ["syncweb", "folders", "--pending", "--join"]
+        folders_cmd = ["folders", "--pending", "--join"]
         if not args.non_local:
             folders_cmd.append("--local-only")
-        if args.devices_include:
-            devices_cmd.extend(["--include", ",".join(args.devices_include)])
-        if args.devices_exclude:
-            devices_cmd.extend(["--exclude", ",".join(args.devices_exclude)])
+        if args.folders_include:
+            folders_cmd.extend(["--include", ",".join(args.folders_include)])
+        if args.folders_exclude:
+            folders_cmd.extend(["--exclude", ",".join(args.folders_exclude)])
         if args.folder_types:
-            devices_cmd.extend(["--folder-types", ",".join(args.folder_types)])
+            folders_cmd.extend(["--folder-types", ",".join(args.folder_types)])
         # Actions
         if args.join_new_folders:
             folders_cmd.append("--discovered")
         if args.folders:
             folders_cmd.append("--introduce")
 
-        run(folders_cmd)
-        if shutdown.wait(SLEEP_JOIN):
-            break
+        if "folders" in steps:
+            run_command(args, folders_cmd)
 
         # 3. Files
         # Mark new downloads via wishlists
-        paths = get_download_paths()
+        paths = get_download_paths(wishlist) if "files" in steps else None
+        if paths:
+            # absolute paths so that none of them can be mistaken for an option
+            paths = [os.path.abspath(p) for p in paths]
+            sorted_paths = run_command(args, ["sort", f"--sort={args.sort}", *paths], func=sort_paths)
+            if sorted_paths:
+                if run_command(args, ["download", "--yes", *sorted_paths], func=succeeds):
+                    wishlist.commit()  # otherwise (or when sort filtered everything) they are returned again
+                # the ignore writes make Syncthing rescan and pull: do not wake up for our own changes
+                wakeups.mute({args.st.folder_resolver.resolve(p)[0] for p in sorted_paths} - {None})
+        wakeups.ran(steps)
+
+        # sleep until Syncthing reports something relevant; when nothing happens re-check everything
+        # anyway (wishlists and discovery do not emit events) but back off while idle
         if paths:
-            stdin = "\n".join(paths) + "\n"
-            sorted_paths = run(["syncweb", "sort", "--sort", args.sort], stdin=stdin, capture_output=True)
-            run(["syncweb", "download", "--yes"], stdin=sorted_paths.stdout)  # type: ignore
+            idle = MIN_IDLE
+        steps = wakeups.wait(idle)
+        if steps:
+            log.debug("[syncweb-daemon] woken for %s", ", ".join(sorted(steps)))
+        else:
+            steps = set(STEPS)
+            idle = min(idle * 2, MAX_IDLE)
 
 
 def cmd_automatic(args):
     signal.signal(signal.SIGTERM, handle_signal)
     signal.signal(signal.SIGINT, handle_signal)
     syncweb_automatic(args)
-
-
-if __name__ == "__main__":
-    cmd_automatic(
-        argparse.Namespace(
-            non_local=False,
-            devices=False,
-            folders=False,
-            join_new_folders=False,
-        )
-    )
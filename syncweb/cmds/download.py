@@ -1,13 +1,15 @@
 #!/usr/bin/env python3
-import os, shlex, shutil
-from collections import defaultdict
+import shlex, time
+from collections import defaultdict, deque
 from pathlib import Path
 
 from syncweb import str_utils
 from syncweb.cmds.ls import is_directory, path2fid
 from syncweb.log_utils import log
+from syncweb.mounts import MountTable
+from syncweb.str_utils import human_to_bytes
+from syncweb.tree import CompactTree
 
-# TODO: count pending downloads against free space
 # TODO: don't count existing files against free space
 
 
@@ -43,16 +45,9 @@ def calculate_min_disk_free(total_space, min_disk_free):
         return value
 
 
-def get_folder_space_info(args, folder_id):
+def get_folder_space_info(args, folder_id, mounts: MountTable, status: dict | None = None):
     try:
-        # Get folder info
-        folders = args.st.folders() or []
-        folder_info = None
-        for folder in folders:
-            if folder["id"] == folder_id:
-                folder_info = folder
-                break
-
+        folder_info = args.st.folder_resolver.folder(folder_id)
         if not folder_info:
             return None
 
@@ -60,42 +55,25 @@ def get_folder_space_info(args, folder_id):
         if not folder_path:
             return None
 
-        # Get disk space info
-        disk_stat = shutil.disk_usage(folder_path)
+        # Get disk space info; one stat here, statvfs and the mountpoint are shared per device
+        device_id = mounts.device(folder_path)
+        disk_stat = mounts.usage(folder_path, device_id)
+        try:
+            mountpoint_str = mounts.mountpoint(folder_path, device_id)
+        except Exception:
+            # Fallback: use the folder path itself
+            mountpoint_str = folder_path
 
         # Get pending download size from Syncthing
         pending_download = 0
         try:
-            status = args.st.folder_status(folder_id)
-            pending_download = status.get("needBytes", 0)
+            if status is None:
+                status = args.st.folder_status(folder_id)
+            pending_download = status.get("needBytes", 0)  # type: ignore
             log.debug("Folder %s has %d bytes pending download", folder_id, pending_download)
         except Exception as e:
             log.debug("Failed to get needBytes for folder %s: %s", folder_id, e)
 
-        # Try to get actual mountpoint for better grouping
-        try:
-            # Get the actual mountpoint by checking stat.st_dev
-            path_obj = Path(folder_path).resolve()
-            folder_stat = os.stat(path_obj)
-            dev = folder_stat.st_dev
-
-            # Find mountpoint by walking up until device changes
-            mountpoint = path_obj
-            while mountpoint.parent != mountpoint:
-                try:
-                    parent_stat = os.stat(mountpoint.parent)
-                    if parent_stat.st_dev != dev:
-                        break
-                    mountpoint = mountpoint.parent
-                except (OSError, PermissionError):
-                    break
-            mountpoint_str = str(mountpoint)
-            device_id = dev
-        except Exception:
-            # Fallback: use the folder path itself
-            mountpoint_str = folder_path
-            device_id = None
-
         # Calculate minimum free space to preserve
         min_disk_free_config = folder_info.get("minDiskFree", {"value": 1, "unit": "%"})
         min_free = calculate_min_disk_free(disk_stat.total, min_disk_free_config)
@@ -156,7 +134,7 @@ def calculate_mountpoint_pending_downloads(folder_ids, folder_stats) -> int:
 
 
 def build_download_plan(args, paths):
-    plan = defaultdict(list)
+    candidates = []
     for path in paths:
         path = path.strip()
         if not path:
@@ -168,7 +146,7 @@ def build_download_plan(args, paths):
         if folder_id is None:
             log.warning("%s is not inside of a Syncthing folder", shlex.quote(str(abs_path)))
             continue
-        if args.st.folder(folder_id)["type"] == "sendonly":
+        if args.st.folder_resolver.folder(folder_id)["type"] == "sendonly":
             log.info("%s is a sendonly folder", shlex.quote(folder_id))
             continue
 
@@ -180,19 +158,26 @@ def build_download_plan(args, paths):
                 log.debug("%s: already exists...", path)
                 continue
 
+        candidates.append((path, folder_id, prefix))
+
+    def lookup(candidate):
+        _path, folder_id, prefix = candidate
+        relative = prefix.strip("/")  # the form Syncthing reports in events and db/prio expects
         file_data = args.st.file(folder_id, prefix)
         if file_data and file_data["global"]["type"] != "FILE_INFO_TYPE_DIRECTORY":
-            size = file_data["global"]["size"]
-            plan[folder_id].append((prefix, size))
-        else:
-            folder_data = args.st.files(folder_id, levels=args.depth, prefix=prefix)
-            if not folder_data:
-                log.warning("%s: No data returned", shlex.quote(path))
-                continue
+            return [(relative, file_data["global"]["size"])]
 
-            # Collect files
-            for file_path, size in collect_files(args, folder_data, prefix):
-                plan[folder_id].append((file_path, size))
+        folder_data = CompactTree.from_entries(args.st.files_iter(folder_id, levels=args.depth, prefix=prefix)).top()
+        if not folder_data:
+            return None
+        return list(collect_files(args, folder_data, relative))
+
+    plan = defaultdict(list)
+    for (path, folder_id, _prefix), files in args.st.gather(lookup, candidates):
+        if files is None:
+            log.warning("%s: No data returned", shlex.quote(path))
+            continue
+        plan[folder_id].extend(files)
 
     return plan
 
@@ -201,13 +186,23 @@ def print_download_summary(args, plan) -> bool:
     if not plan:
         return False
 
+    def folder_status(folder_id):
+        try:
+            return args.st.folder_status(folder_id)
+        except Exception as e:
+            log.debug("Failed to get needBytes for folder %s: %s", folder_id, e)
+            return {}
+
+    statuses = dict(args.st.gather(folder_status, plan, ordered=False))
+    mounts = MountTable()
+
     # Calculate totals per folder
     folder_stats = {}
     warnings = []
     for folder_id, files in plan.items():
         total_size = sum(size for _, size in files)
         file_count = len(files)
-        space_info = get_folder_space_info(args, folder_id)
+        space_info = get_folder_space_info(args, folder_id, mounts, statuses[folder_id])
 
         folder_stats[folder_id] = {"count": file_count, "size": total_size, "space_info": space_info}
 
@@ -368,6 +363,335 @@ def print_download_summary(args, plan) -> bool:
         return False
 
 
+def needs_pull(file_data) -> bool:
+    """False once Syncthing will not pull a file: it was removed from the cluster or the local copy is current"""
+    global_ = (file_data or {}).get("global") or {}
+    if not global_ or global_.get("deleted"):
+        return False
+    local = file_data.get("local") or {}
+    if local.get("ignored") or local.get("invalid") or local.get("deleted"):
+        return True  # still ignored: Syncthing has not applied the new ignores yet
+    return not local.get("version") or local.get("version") != global_.get("version")
+
+
+PRIO_EVENTS = ["ItemFinished", "LocalIndexUpdated", "FolderSummary"]
+
+
+def latest_event_id(st, event_types) -> int:
+    latest = st.events(since=0, limit=1, timeout=0, event_types=event_types)
+    return latest[-1]["id"] if latest else 0
+
+
+class Prioritizer:
+    """Keeps the next files of each folder, in plan order, at the front of Syncthing's pull queue
+
+    db/prio moves one needed file to the front of its folder's queue, otherwise pulled in the folder's
+    configured order (random by default), and does nothing for files which are still ignored. So a window
+    is only sent once db/file shows its files are no longer ignored: after the folder's LocalIndexUpdated
+    or FolderSummary events, or when events go quiet. Each window is sent in reverse so that it ends up in
+    order, and is topped up once half of it finished.
+    """
+
+    def __init__(self, st, window=10, timeout=30, stall_timeout=600):
+        self.st = st
+        self.window = window
+        self.timeout = timeout
+        self.stall_timeout = stall_timeout
+        self.queued: dict[str, deque[str]] = {}
+        self.front: dict[str, list[str]] = {}  # next files in plan order, not finished yet
+        self.ready: dict[str, set[str]] = {}  # files of front which Syncthing will pull
+        self.unfinished: dict[str, set[str]] = {}
+        self.changed: set[str] = set()  # folders whose local index changed since the last refill
+        self.since = 0
+
+    def add(self, folder_id, paths):
+        paths = [path.strip("/") for path in paths]  # relative, as in events and db/prio
+        self.queued.setdefault(folder_id, deque()).extend(paths)
+        self.front.setdefault(folder_id, [])
+        self.ready.setdefault(folder_id, set())
+        self.unfinished.setdefault(folder_id, set()).update(paths)
+
+    def finished(self, folder_id, path) -> bool:
+        if path not in self.unfinished.get(folder_id, ()):
+            return False
+        self.unfinished[folder_id].discard(path)
+        self.ready[folder_id].discard(path)
+        if path in self.front[folder_id]:
+            self.front[folder_id].remove(path)
+        return True
+
+    def send(self, folder_id, force=False) -> int:
+        """Prioritize the ready part of a folder's window; returns how many of its files became ready"""
+        front, ready = self.front[folder_id], self.ready[folder_id]
+        unchecked = [path for path in front if path not in ready]
+        newly_ready = 0
+        for path, file_data in self.st.gather(lambda p: self.st.file(folder_id, p), unchecked):
+            if not needs_pull(file_data):
+                self.finished(folder_id, path)  # already local or removed from the cluster
+            elif not (file_data.get("local") or {}).get("ignored"):
+                ready.add(path)
+                newly_ready += 1
+        if not (newly_ready or force):
+            return 0
+
+        for path in reversed([path for path in front if path in ready]):
+            try:
+                self.st.prioritize_file_transfer(folder_id, path)
+            except Exception as e:
+                log.warning("[%s] Could not prioritize %s: %s", folder_id, path, e)
+        return newly_ready
+
+    def top_up(self, folder_id) -> bool:
+        """Extend the window once half of it finished; returns True if files were added"""
+        queue, front = self.queued[folder_id], self.front[folder_id]
+        if len(front) > self.window // 2:
+            return False
+        added = False
+        while queue and len(front) < self.window:
+            path = queue.popleft()
+            if path in self.unfinished[folder_id]:
+                front.append(path)
+                added = True
+        return added
+
+    def refill(self, force=False) -> int:
+        """Top up each folder's window and send it when it changed; returns how many files became ready"""
+        newly_ready = 0
+        for folder_id in self.queued:
+            resend = force
+            check = force or folder_id in self.changed
+            # checking files can finish some of them, which makes room for more
+            while self.top_up(folder_id) or check:
+                newly_ready += self.send(folder_id, resend)
+                resend = check = False
+        self.changed.clear()
+        return newly_ready
+
+    def pending(self) -> int:
+        return sum(len(paths) for paths in self.unfinished.values())
+
+    def apply_events(self, events) -> bool:
+        """Returns True if any added file finished"""
+        progress = False
+        for event in events:
+            data = event.get("data") or {}
+            folder_id = data.get("folder")
+            if event.get("type") in ("LocalIndexUpdated", "FolderSummary"):
+                if folder_id in self.front:
+                    self.changed.add(folder_id)  # new ignores may have been applied
+            elif data.get("error"):
+                continue  # a failed pull is retried by Syncthing; the file stays unfinished
+            elif self.finished(folder_id, data.get("item")):
+                progress = True
+        return progress
+
+    def run(self):
+        """Keep prioritizing until every added file finished, or nothing changed for stall_timeout seconds"""
+        self.refill()
+        last_progress = time.monotonic()
+        while self.pending():
+            events = self.st.events(since=self.since, timeout=self.timeout, event_types=PRIO_EVENTS)
+            if events:
+                self.since = events[-1]["id"]
+                progress = self.apply_events(events)
+                progress = self.refill() > 0 or progress
+            else:
+                # quiet for a while: re-check the windows and resend them
+                progress = self.refill(force=True) > 0
+
+            if progress:
+                last_progress = time.monotonic()
+            elif time.monotonic() - last_progress > self.stall_timeout:
+                log.warning(
+                    "No download progress for %ds; %d files are not downloaded yet", self.stall_timeout, self.pending()
+                )
+                break
+
+
+class DownloadScheduler:
+    """Unignores a download plan in batches that fit the free disk space and an in-flight byte budget
+
+    Files wait in one queue per mountpoint. A mountpoint's committed bytes are its folders' needBytes, or
+    the bytes released by this scheduler and not yet finished if Syncthing has not caught up with those.
+    More files are released whenever ItemFinished events report progress; failed pulls stay committed
+    because Syncthing retries them. Released files which never finish (already local, removed remotely) are
+    dropped once db/file shows they are not needed, and run() gives up when nothing changes for
+    stall_timeout seconds. db/status is only asked again for folders which had events since the last batch.
+
+    Event IDs are counted per subscription mask, so the scheduler and its prioritizer share one mask.
+    """
+
+    def __init__(
+        self, args, plan, in_flight_budget: int | None = None, timeout=60, prioritizer=None, stall_timeout=600
+    ):
+        self.args = args
+        self.prioritizer = prioritizer
+        self.st = args.st
+        self.in_flight_budget = in_flight_budget
+        self.timeout = timeout
+        self.stall_timeout = stall_timeout
+        self.folder_files = {
+            folder_id: deque((path.strip("/"), size) for path, size in files)
+            for folder_id, files in plan.items()
+            if files
+        }
+        self.released: dict[tuple[str, str], int] = {}  # (folder_id, path) -> size, until it is not needed
+        self.event_types = PRIO_EVENTS if prioritizer else ["ItemFinished"]
+        self.since = 0
+        self.mounts = MountTable()
+        self.statuses: dict[str, dict] = {}
+        self.changed: set[str] = set(self.folder_files)  # folders whose db/status needs to be fetched again
+
+    def pending(self) -> int:
+        return sum(len(files) for files in self.folder_files.values())
+
+    def drop_finished(self) -> int:
+        """Forget released files that Syncthing no longer needs to pull; returns how many were dropped"""
+        done = [
+            k
+            for k, file_data in self.st.gather(lambda k: self.st.file(*k), list(self.released))
+            if not needs_pull(file_data)
+        ]
+        for key in done:
+            del self.released[key]
+            self.changed.add(key[0])
+        return len(done)
+
+    def release(self) -> int:
+        """Release the next files which fit; returns the number of files released"""
+        folder_ids = list(self.folder_files)
+        stale = [folder_id for folder_id in folder_ids if folder_id in self.changed or folder_id not in self.statuses]
+        self.statuses.update(self.st.gather(self.st.folder_status, stale, ordered=False))
+        self.changed.clear()
+        self.mounts.refresh()
+        space = {
+            folder_id: get_folder_space_info(self.args, folder_id, self.mounts, self.statuses[folder_id])
+            for folder_id in folder_ids
+        }
+
+        released_by_folder = defaultdict(int)
+        for (folder_id, _path), size in self.released.items():
+            released_by_folder[folder_id] += size
+
+        mountpoints = defaultdict(list)
+        for folder_id in folder_ids:
+            info = space[folder_id]
+            mountpoints[info["mountpoint"] if info else f"unknown_{folder_id}"].append(folder_id)
+
+        committed = {}
+        room = {}
+        for mountpoint, mount_folder_ids in mountpoints.items():
+            committed[mountpoint] = sum(
+                max((space[fid] or {}).get("pending_download", 0), released_by_folder[fid]) for fid in mount_folder_ids
+            )
+            infos = [space[fid] for fid in mount_folder_ids if space[fid]]
+            if infos:
+                max_min_free = max(info["min_free"] for info in infos)
+                room[mountpoint] = infos[0]["free"] - max_min_free - committed[mountpoint]
+            else:
+                room[mountpoint] = float("inf")
+
+        budget = float("inf")
+        if self.in_flight_budget is not None:
+            budget = self.in_flight_budget - sum(committed.values())
+
+        batch = defaultdict(list)
+        for mountpoint, mount_folder_ids in mountpoints.items():
+            # round-robin over the folders of a mountpoint so that one large folder does not starve the others
+            active = [fid for fid in mount_folder_ids if self.folder_files[fid]]
+            while active:
+                for folder_id in list(active):
+                    files = self.folder_files[folder_id]
+                    path, size = files[0]
+                    if size > min(room[mountpoint], budget):
+                        active.remove(folder_id)
+                        continue
+                    files.popleft()
+                    room[mountpoint] -= size
+                    budget -= size
+                    batch[folder_id].append(path)
+                    self.released[(folder_id, path)] = size
+                    if not files:
+                        active.remove(folder_id)
+
+        if not batch and not self.released and not any(committed.values()):
+            # nothing is downloading so waiting will not free any space: these files can never fit
+            for folder_id, files in self.folder_files.items():
+                for path, size in files:
+                    log.warning("[%s] %s (%s) does not fit; skipping", folder_id, path, str_utils.file_size(size))
+                files.clear()
+
+        with self.st.batch_ignores():
+            for folder_id, paths in batch.items():
+                log.info("[%s] Releasing %d files", folder_id, len(paths))
+                self.st.add_ignores(folder_id, paths)
+        if self.prioritizer:
+            for folder_id, paths in batch.items():
+                self.prioritizer.add(folder_id, paths)
+            self.prioritizer.refill()
+        self.folder_files = {folder_id: files for folder_id, files in self.folder_files.items() if files}
+        return sum(len(paths) for paths in batch.values())
+
+    def wait(self):
+        """Block until one of the released files finishes or timeout"""
+        deadline = time.monotonic() + self.timeout
+        while (remaining := deadline - time.monotonic()) > 0:
+            events = self.st.events(since=self.since, timeout=max(1, int(remaining)), event_types=self.event_types)
+            if not events:
+                continue
+            self.since = events[-1]["id"]
+            if self.prioritizer:
+                self.prioritizer.since = self.since
+                self.prioritizer.apply_events(events)
+                self.prioritizer.refill()
+
+            progress = False
+            for event in events:
+                data = event.get("data") or {}
+                if event.get("type") != "ItemFinished":
+                    continue
+                self.changed.add(data.get("folder"))
+                key = (data.get("folder"), data.get("item"))
+                if key not in self.released:
+                    continue
+                if data.get("error"):
+                    log.warning("[%s] %s failed: %s; Syncthing will retry", key[0], key[1], data["error"])
+                else:
+                    del self.released[key]
+                    progress = True
+            if progress:
+                return True
+        return False
+
+    def run(self) -> int:
+        # only files finishing after this point are of interest
+        self.since = latest_event_id(self.st, self.event_types)
+        if self.prioritizer:
+            self.prioritizer.since = self.since
+
+        released = 0
+        last_progress = time.monotonic()
+        while self.folder_files:
+            if self.released and self.drop_finished():
+                last_progress = time.monotonic()
+            count = self.release()
+            released += count
+            if not self.folder_files:
+                break
+            if count:
+                last_progress = time.monotonic()
+            elif time.monotonic() - last_progress > self.stall_timeout:
+                log.warning(
+                    "No download progress for %ds; %d files were not released", self.stall_timeout, self.pending()
+                )
+                break
+
+            log.info("%d files waiting for disk space or in-flight budget", self.pending())
+            if self.wait():
+                last_progress = time.monotonic()
+        return released
+
+
 def cmd_download(args):
     if not args.paths:
         log.error("No paths provided")
@@ -386,6 +710,20 @@ def cmd_download(args):
         log.info("Download cancelled")
         raise SystemExit(3)
 
+    prioritizer = None
+    if args.prioritize:
+        prioritizer = Prioritizer(args.st, window=args.prioritize)
+        prioritizer.since = latest_event_id(args.st, PRIO_EVENTS)
+
+    if args.schedule:  # the scheduler keeps prioritizer.since in step, both use PRIO_EVENTS
+        in_flight = human_to_bytes(args.in_flight) if args.in_flight else None
+        scheduler = DownloadScheduler(args, plan, in_flight, prioritizer=prioritizer)
+        download_count = scheduler.run()
+        log.info("Total: Released %d files across %d folders", download_count, len(plan))
+        if prioritizer:
+            prioritizer.run()
+        return
+
     # Execute unignore operations
     download_count = 0
     for folder_id, files in plan.items():
@@ -396,9 +734,14 @@ def cmd_download(args):
                 log.info("Queueing %d files in folder %s...", len(rel_paths), folder_id)
                 args.st.add_ignores(folder_id, rel_paths)
                 download_count += len(rel_paths)
+                if prioritizer:
+                    prioritizer.add(folder_id, rel_paths)
 
             except Exception as e:
                 log.error("Failed to unignore files in folder %s: %s", folder_id, str(e))
                 continue
 
     log.info("Total: Queued %d files across %d folders", download_count, len(plan))
+    if prioritizer:
+        log.info("Prioritizing downloads in sort order, %d files at a time per folder...", args.prioritize)
+        prioritizer.run()
@@ -33,106 +33,91 @@ def split_pattern(pattern: str) -> List[str]:
     return shlex.split(pattern) if pattern else []
 
 
-def regex_match(name: str, patterns: List[str], ignore_case: bool) -> bool:
+def compile_name_matcher(patterns: List[str], ignore_case: bool, fixed_strings=False, glob=False):
+    """Returns a function(name) -> bool which requires every pattern to match, or None to match everything"""
     flags = re.IGNORECASE if ignore_case else 0
 
-    for pattern in patterns:
-        if pattern == ".*":
-            continue  # Match-all pattern, skip
-
-        try:
-            if not re.search(pattern, name, flags):
-                return False
-        except re.error:  # invalid regex
-            return False
-
-    return True
-
-
-def exact_match(name: str, patterns: List[str], ignore_case: bool) -> bool:
-    search_name = name.lower() if ignore_case else name
-
-    for pattern in patterns:
-        search_pattern = pattern.lower() if ignore_case else pattern
-        if search_pattern not in search_name:
-            return False
-
-    return True
+    if fixed_strings:
+        if not patterns:
+            return None
+        if ignore_case:
+            needles = [pattern.lower() for pattern in patterns]
+            return lambda name: all(needle in name.lower() for needle in needles)
+        return lambda name: all(needle in name for needle in patterns)
 
+    if glob:
+        patterns = [fnmatch.translate(pattern) for pattern in patterns]
+    else:
+        patterns = [pattern for pattern in patterns if pattern != ".*"]  # match-all pattern, skip
+    if not patterns:
+        return None
 
-def glob_match(name: str, patterns: List[str], ignore_case: bool) -> bool:
     try:
-        for pattern in patterns:
-            if ignore_case:
-                if not fnmatch.fnmatchcase(name.lower(), pattern.lower()):
-                    return False
-            else:
-                if not fnmatch.fnmatchcase(name, pattern):
-                    return False
-        return True
-    except Exception as e:
-        log.debug("glob failed, %s", e)
-        return False
-
-
-def matches_constraints(args, item: dict, current_depth: int, item_path: str = "") -> bool:
-    name = item.get("name", "")
-    is_dir = is_directory(item)
-
-    # Use full path or just filename for pattern matching
-    search_target = item_path if args.full_path else name
-
-    if args.type:
-        if args.type == "d" and not is_dir:
+        compiled = [re.compile(pattern, flags) for pattern in patterns]
+    except re.error as e:  # invalid regex
+        log.error("Invalid pattern: %s", e)
+        return lambda name: False
+
+    if len(compiled) == 1:
+        test = compiled[0].match if glob else compiled[0].search
+        return lambda name: test(name) is not None
+    tests = [c.match if glob else c.search for c in compiled]
+    return lambda name: all(test(name) is not None for test in tests)
+
+
+def compile_predicate(args):
+    """Fuse the parsed find args into one predicate(item, is_dir, depth, item_path) -> bool
+
+    Cheap checks run first; patterns and bounds are compiled once instead of per item.
+    """
+    want_dir = {"d": True, "f": False}.get(args.type)
+    min_depth = args.min_depth
+    max_depth = args.max_depth
+    hidden = args.hidden
+    exts = args.ext
+    sizes = args.sizes
+    time_modified = args.time_modified
+    full_path = args.full_path
+    name_matches = compile_name_matcher(args.patterns, args.ignore_case, args.fixed_strings, args.glob)
+    now = consts.APPLICATION_START
+
+    def predicate(item: dict, is_dir: bool, depth: int, item_path: str) -> bool:
+        if want_dir is not None and is_dir is not want_dir:
             return False
-        if args.type == "f" and is_dir:
+        if depth < min_depth or (max_depth is not None and depth > max_depth):
             return False
 
-    if current_depth < args.min_depth:
-        return False
-    if args.max_depth is not None and current_depth > args.max_depth:
-        return False
-
-    if not args.hidden and name.startswith("."):
-        return False
-    if args.ext and not name.lower().endswith(args.ext):
-        return False
-
-    if args.sizes:
-        if is_dir:
-            file_size = folder_size(item)
-        else:
-            file_size = item.get("size", 0)
-
-        if not args.sizes(file_size):
+        name = item.get("name", "")
+        if not hidden and name.startswith("."):
             return False
-
-    if args.time_modified:
-        mod_time = isodate2seconds(item["modTime"])
-        if not args.time_modified(consts.APPLICATION_START - mod_time):
+        if exts and not name.lower().endswith(exts):
             return False
 
-    if args.fixed_strings:
-        if not exact_match(search_target, args.patterns, args.ignore_case):
+        if sizes and not sizes(folder_size(item) if is_dir else item.get("size", 0)):
             return False
-    elif args.glob:
-        if not glob_match(search_target, args.patterns, args.ignore_case):
+
+        if name_matches is not None and not name_matches(item_path if full_path else name):
             return False
-    else:
-        if not regex_match(search_target, args.patterns, args.ignore_case):
+
+        if time_modified and not time_modified(now - isodate2seconds(item["modTime"])):
             return False
 
-    return True
+        return True
+
+    return predicate
 
 
 def find_files(args, items, current_path: str | None = "", current_depth: int = 0):
+    if "predicate" not in args:
+        args.predicate = compile_predicate(args)
+
     for item in items:
         name = item.get("name", "")
         item_path = f"{current_path}/{name}" if current_path else name
 
         is_dir = is_directory(item)
-        if matches_constraints(args, item, current_depth, item_path):
-            if is_dir and log_utils.is_terminal:
+        if args.predicate(item, is_dir, current_depth, item_path):
+            if is_dir and log_utils.in_terminal():
                 yield f"{item_path}/"
             else:
                 yield item_path
@@ -146,37 +131,49 @@ def find_files(args, items, current_path: str | None = "", current_depth: int =
             yield from find_files(args, item["children"], item_path, current_depth + 1)
 
 
+def find_entries(args, entries, folder_prefix: str | None, current_path: str | None = "", current_depth: int = 0):
+    """Flat counterpart of find_files for streamed (path, parent, depth, item) entries"""
+    if "predicate" not in args:
+        args.predicate = compile_predicate(args)
+
+    folder_prefix = (folder_prefix or "").strip("/")
+    base_depth = folder_prefix.count("/") + 1 if folder_prefix else 0
+    skip = len(folder_prefix) + 1 if folder_prefix else 0
+
+    for path, _parent, depth, item in entries:
+        depth = current_depth + depth - base_depth
+        if args.max_depth is not None and depth > args.max_depth:
+            continue
+
+        item_path = f"{current_path}/{path[skip:]}" if current_path else path[skip:]
+        is_dir = is_directory(item)
+        if args.predicate(item, is_dir, depth, item_path):
+            if is_dir and log_utils.in_terminal():
+                yield f"{item_path}/"
+            else:
+                yield item_path
+
+
 def path2fid_allow_outside(args, abs_path):
     # user_prefix: Path prefix to show to user (any path parts above Syncthing folder)
-    for folder in args.st.folders() or []:
-        if args.downloadable and folder["type"] == "sendonly":
-            continue
+    resolver = args.st.folder_resolver
 
-        folder_path = Path(folder["path"]).resolve()
+    def skip(folder):
+        return args.downloadable and folder["type"] == "sendonly"
 
-        try:
-            rel_path = abs_path.relative_to(folder_path)
-            # Path is inside Syncthing folder
-            user_prefix = ""  # No prefix needed
-            prefix = str(rel_path) if rel_path and str(rel_path) != "." else ""
-            folder_id = folder["id"]
-            yield folder_id, prefix, user_prefix
+    for folder, prefix in resolver.containing(abs_path):
+        # Path is inside Syncthing folder; nested folders that are skipped fall back to the enclosing one
+        if not skip(folder):
+            yield folder["id"], prefix or "", ""
             break
-        except ValueError:
-            pass
-
-        try:
-            rel_path = folder_path.relative_to(abs_path)
-            # Syncthing folder is inside the search path
-            user_prefix = str(rel_path)  # relative path to Syncthing folder root
-            prefix = ""  # Search API from root of Syncthing folder
-            folder_id = folder["id"]
-            yield folder_id, prefix, user_prefix
-        except ValueError:
-            continue
 
+    for folder, user_prefix in resolver.below(abs_path):
+        # Syncthing folder is inside the search path; search API from root of Syncthing folder
+        if not skip(folder):
+            yield folder["id"], "", user_prefix
 
-def cmd_find(args) -> None:
+
+def prepare_find(args) -> None:
     args.ext = tuple(s.lower() for s in args.ext)
 
     args.min_depth, args.max_depth = parse_depth_constraints(args.depth, args.min_depth, args.max_depth)
@@ -213,23 +210,44 @@ If you want to search for all files inside the '%s' directory, use a match-all p
             args.pattern,
         )
 
+    args.predicate = compile_predicate(args)
+
+
+def find_results(args, folder_ids=None):
+    """Yields (folder_id, path) for each match; folder_ids limits the search to those folders"""
     for path in args.search_paths or ["."]:
         abs_path = Path(path).resolve()
+        found = False
         for folder_id, prefix, user_prefix in path2fid_allow_outside(args, abs_path):
-            if folder_id is None:
+            found = True
+            if folder_id is None or (folder_ids is not None and folder_id not in folder_ids):
                 continue
 
-            data = args.st.files(folder_id, levels=args.max_depth, prefix=prefix)
-            log.debug("files: %s top-level data", len(data))
-
+            folder_prefix = prefix
             if user_prefix:
                 prefix = os.path.join(user_prefix, prefix) if prefix else user_prefix
+            start_depth = prefix.count("/") if prefix else 0
 
-            for p in find_files(args, data, prefix, (prefix.count("/") + 0) if prefix else 0):
+            if args.sizes and args.type != "f":
+                # directory sizes need the whole subtree
+                data = args.st.indexed_tree(folder_id, levels=args.max_depth, prefix=folder_prefix).top()
+                log.debug("files: %s top-level data", len(data))
+                results = find_files(args, data, prefix, start_depth)
+            else:
+                entries = args.st.indexed_entries(folder_id, levels=args.max_depth, prefix=folder_prefix)
+                results = find_entries(args, entries, folder_prefix, prefix, start_depth)
+
+            for p in results:
                 if path != ".":
                     p = os.path.join(path, p)
                 if args.absolute_path:
                     p = os.path.realpath(p)
-                pipe_print(p)
-        else:
+                yield folder_id, p
+        if not found:
             log.error("%s is not inside nor a parent of a Syncweb folder", shlex.quote(str(abs_path)))
+
+
+def cmd_find(args) -> None:
+    prepare_find(args)
+    for _folder_id, p in find_results(args):
+        pipe_print(p)
@@ -49,6 +49,19 @@ def conform_pending_folders(pending):
     return summaries
 
 
+def disk_free(path, cache: dict) -> int | None:
+    """Free bytes of the filesystem holding path; measured once per device in cache"""
+    if not path:
+        return None
+    try:
+        device = os.stat(path).st_dev
+    except OSError:
+        return None
+    if device not in cache:
+        cache[device] = shutil.disk_usage(path).free
+    return cache[device]
+
+
 def cmd_list_folders(args):
     if not any([args.joined, args.pending, args.discovered]):
         args.joined, args.pending, args.discovered = True, True, True
@@ -89,7 +102,7 @@ def cmd_list_folders(args):
         known_devices.extend(args.st.pending_devices(local_only=args.local_only).keys())
         known_devices.extend(args.st.discovered_devices(local_only=args.local_only).keys())
 
-    filtered_folders = []
+    candidates = []
     for folder_id, folder in folders.items():
         label = folder.get("label")
         path = folder.get("path")
@@ -104,15 +117,6 @@ def cmd_list_folders(args):
         if args.introduce:
             pending_devices = list(set(pending_devices) | set([s for s in known_devices if s not in devices]))
 
-        discovered_folder = not devices
-        folder_status = {} if discovered_folder else args.st.folder_status(folder_id)
-        if args.missing:
-            error = folder_status.get("error")
-            if error is None:
-                continue
-            elif "folder path missing" not in error:
-                continue
-
         if args.include:
             if not all(s in label or s in folder_id or s in path for s in args.include):
                 continue
@@ -123,34 +127,43 @@ def cmd_list_folders(args):
         if args.folder_types and folder_type not in args.folder_types:
             continue
 
-        free_space = None
-        if path and os.path.exists(path):
-            disk_info = shutil.disk_usage(path)
-            if disk_info:
-                free_space = file_size(disk_info.free)
-
-        filtered_folders.append(
+        candidates.append(
             {
                 "folder_id": folder_id,
                 "label": label,
                 "path": path,
                 "type": folder_type,
-                "free_space": free_space,
                 "paused": paused,
-                "folder_status": folder_status,
                 "devices": devices,
                 "pending_devices": pending_devices,
             }
         )
 
-    if not filtered_folders:
-        log.info("No folders matched query")
-        return
+    # db/status is computed by Syncthing on request and can be slow: only ask for the folders which are
+    # left after filtering, only when it is shown or filtered on, and several at a time
+    need_status = args.missing or not args.print
 
-    if args.print:
-        for d in filtered_folders:
-            folder_id = d["folder_id"]
+    def get_status(d):
+        if need_status and d["devices"]:
+            return args.st.folder_status(d["folder_id"])
+        return {}
 
+    filtered_folders = []
+    free_by_device = {}
+    for d, folder_status in args.st.gather(get_status, candidates):
+        if args.missing:
+            error = folder_status.get("error")
+            if error is None:
+                continue
+            elif "folder path missing" not in error:
+                continue
+
+        d["folder_status"] = folder_status
+        filtered_folders.append(d)
+
+        if args.print:
+            # rows are printed as soon as their status arrives
+            folder_id = d["folder_id"]
             discovered_folder = not d["devices"]
             pending_devices = d["pending_devices"]
             if discovered_folder and pending_devices:
@@ -158,7 +171,15 @@ def cmd_list_folders(args):
             else:
                 url = f"sync://{folder_id}#{args.st.device_id}"
             str_utils.pipe_print(url)
-    else:
+        else:
+            free = disk_free(d["path"], free_by_device)
+            d["free_space"] = None if free is None else file_size(free)
+
+    if not filtered_folders:
+        log.info("No folders matched query")
+        return
+
+    if not args.print:
         table_data = []
         for d in filtered_folders:
             path = d["path"]
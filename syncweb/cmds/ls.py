@@ -7,31 +7,40 @@ from syncweb.str_utils import format_time
 
 
 def path2fid(args, abs_path):
-    for folder in args.st.folders() or []:
-        folder_path = Path(folder["path"]).resolve()
-        try:
-            prefix = abs_path.relative_to(folder_path)
-            prefix = str(prefix) if prefix and str(prefix) != "." else None
-            folder_id = folder["id"]
-            return folder_id, prefix
-        except ValueError:
-            continue
-
-    return None, None
+    return args.st.folder_resolver.resolve(abs_path)
 
 
 def is_directory(item: dict) -> bool:
     return item.get("type") == "FILE_INFO_TYPE_DIRECTORY"
 
 
+def annotate(items: list[dict]) -> None:
+    """Store total_size, file_count and max_depth on every node in a single bottom-up pass"""
+    stack = [(item, False) for item in items if "max_depth" not in item]
+    while stack:
+        item, children_done = stack.pop()
+        children = item.get("children") if is_directory(item) else None
+        if not children:
+            is_dir = is_directory(item)
+            item["total_size"] = 0 if is_dir and "children" in item else item.get("size", 0)
+            item["file_count"] = 0 if is_dir else 1
+            item["max_depth"] = 0
+        elif children_done:
+            item["total_size"] = sum(child["total_size"] for child in children)
+            item["file_count"] = sum(child["file_count"] for child in children)
+            item["max_depth"] = 1 + max(child["max_depth"] for child in children)
+        else:
+            stack.append((item, True))
+            stack.extend((child, False) for child in children if "max_depth" not in child)
+
+
 def folder_size(item: dict) -> int:
     if not is_directory(item) or "children" not in item:
         return item.get("size", 0)
 
-    total = 0
-    for child in item["children"]:
-        total += folder_size(child)
-    return total
+    if "total_size" not in item:
+        annotate([item])
+    return item["total_size"]
 
 
 def print_entry(item: dict, long: bool = False, human_readable: bool = False) -> None:
@@ -53,13 +62,15 @@ def print_entry(item: dict, long: bool = False, human_readable: bool = False) ->
 
 
 def calculate_depth(item: dict) -> int:
-    if not is_directory(item) or "children" not in item or not item["children"]:
-        return 0
-
-    return 1 + max(calculate_depth(child) for child in item["children"])
+    if "max_depth" not in item:
+        annotate([item])
+    return item["max_depth"]
 
 
 def print_directory(args, items, current_level: int = 1, indent: int = 0) -> None:
+    if current_level == 1:
+        annotate(items)
+
     sorted_items = sorted(
         items,
         key=lambda x: (
@@ -114,7 +125,7 @@ def cmd_ls(args):
             continue
 
         levels = None if args.folder_size else args.depth
-        data = args.st.files(folder_id, levels=levels, prefix=prefix)
+        data = args.st.indexed_tree(folder_id, levels=levels, prefix=prefix).top()
         log.debug("files: %s top-level data", len(data))
 
         if not data and prefix:  # must be a file or not exist
@@ -1,8 +1,7 @@
 #!/usr/bin/env python3
-import os, random, shlex
-from collections import defaultdict
+import bisect, heapq, os, random, shlex
 from pathlib import Path
-from statistics import mean, median
+from statistics import median
 
 from syncweb import str_utils
 from syncweb.cmds.find import parse_depth_constraints
@@ -12,15 +11,108 @@ from syncweb.log_utils import log
 from syncweb.str_utils import human_to_bytes, pipe_print
 
 
-def aggregate_folders(records, output_aggregates, min_depth=None, max_depth=None):
-    agg_funcs = {
-        "mean": mean,
-        "median": median,
-        "sum": sum,
-        "min": min,
-        "max": max,
-        "count": lambda x: len(x),
-    }
+class P2Median:
+    """Streaming median estimate in constant memory (Jain & Chlamtac's P² algorithm); exact up to 5 values"""
+
+    __slots__ = ("count", "heights", "positions", "desired")
+    INCREMENTS = (0, 0.25, 0.5, 0.75, 1)
+
+    def __init__(self):
+        self.count = 0
+        self.heights: list[float] = []
+        self.positions = [1, 2, 3, 4, 5]
+        self.desired = [1.0, 2.0, 3.0, 4.0, 5.0]
+
+    def add(self, x):
+        self.count += 1
+        q, n = self.heights, self.positions
+        if self.count <= 5:
+            bisect.insort(q, x)
+            return
+
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = bisect.bisect_right(q, x) - 1
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self.desired[i] += self.INCREMENTS[i]
+
+        # move the three middle markers towards their desired positions
+        for i in (1, 2, 3):
+            d = self.desired[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                parabolic = q[i] + d / (n[i + 1] - n[i - 1]) * (
+                    (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+                    + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+                )
+                if q[i - 1] < parabolic < q[i + 1]:
+                    q[i] = parabolic
+                else:
+                    q[i] = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+                n[i] += d
+
+    def value(self):
+        if self.count <= 5:
+            return median(self.heights)
+        return self.heights[2]
+
+
+class FieldStats:
+    """Running count, sum, min, max and median of one field of one folder"""
+
+    __slots__ = ("count", "total", "min", "max", "median")
+
+    def __init__(self, with_median=False, exact=False):
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+        self.median = None
+        if with_median:
+            self.median = [] if exact else P2Median()
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+        if isinstance(self.median, list):
+            self.median.append(value)
+        elif self.median is not None:
+            self.median.add(value)
+
+    def result(self, agg):
+        match agg:
+            case "mean":
+                return self.total / self.count
+            case "median":
+                return median(self.median) if isinstance(self.median, list) else self.median.value()  # type: ignore
+            case "sum":
+                return self.total
+            case "min":
+                return self.min
+            case "max":
+                return self.max
+            case "count":
+                return self.count
+        raise ValueError(f"Unknown aggregate '{agg}'")
+
+
+def aggregate_folders(records, output_aggregates, min_depth=None, max_depth=None, exact=False):
+    """Aggregate fields of records per folder in one pass
+
+    Medians are P² estimates unless exact=True, which keeps every value of the median fields in memory.
+    """
+    aggregates = ("mean", "median", "sum", "min", "max", "count")
 
     # Parse aggregate specs like "size_mean"
     parsed = []
@@ -28,9 +120,11 @@ def aggregate_folders(records, output_aggregates, min_depth=None, max_depth=None
         if "_" not in spec:
             raise ValueError(f"Invalid spec '{spec}', expected format 'field_agg'.")
         field, agg = spec.rsplit("_", 1)
-        if agg not in agg_funcs:
+        if agg not in aggregates:
             raise ValueError(f"Unknown aggregate '{agg}' in '{spec}'.")
         parsed.append((spec, field, agg))
+    fields = list(dict.fromkeys(field for _, field, _ in parsed))
+    median_fields = {field for _, field, agg in parsed if agg == "median"}
 
     # Helper to compute grouping folders
     def grouping_keys(path):
@@ -58,8 +152,8 @@ def aggregate_folders(records, output_aggregates, min_depth=None, max_depth=None
                 keys.append(folder)
         return keys
 
-    # grouped[group_folder][field] -> list of values
-    grouped = defaultdict(lambda: defaultdict(list))
+    # grouped[group_folder][field] -> FieldStats
+    grouped = {}
     for d in records:
         path = d.get("path")
         if path.startswith("."):
@@ -67,28 +161,167 @@ def aggregate_folders(records, output_aggregates, min_depth=None, max_depth=None
         if not path:
             continue
 
+        values = [(field, d.get(field)) for field in fields]
+        values = [(field, value) for field, value in values if isinstance(value, (int, float))]
+        if not values:
+            continue
         for group_key in grouping_keys(path):
-            for _, field, _ in parsed:
-                value = d.get(field)
-                if isinstance(value, (int, float)):
-                    grouped[group_key][field].append(value)
+            group = grouped.get(group_key)
+            if group is None:
+                group = grouped[group_key] = {}
+            for field, value in values:
+                stats = group.get(field)
+                if stats is None:
+                    stats = group[field] = FieldStats(field in median_fields, exact)
+                stats.add(value)
 
     results = {}
-    for folder, field_values in grouped.items():
-        folder_result = {"file_count": len(field_values[parsed[0][1]])}
+    for folder, field_stats in grouped.items():
+        first = field_stats.get(parsed[0][1])
+        folder_result = {"file_count": first.count if first else 0}
         for full_key, field, agg in parsed:
-            values = field_values.get(field, [])
-            if values:
-                func = agg_funcs[agg]
-                folder_result[full_key] = func(values)
-        if folder_result:
-            results[folder] = folder_result
+            if field in field_stats:
+                folder_result[full_key] = field_stats[field].result(agg)
+        results[folder] = folder_result
 
     return results
 
 
+FOLDER_MODES = {
+    "folder-size",
+    "foldersize",
+    "folder-avg-size",
+    "folder-size-avg",
+    "foldersize-avg",
+    "folder-date",
+    "folderdate",
+    "folder-time",
+    "foldertime",
+    "count",
+    "file-count",
+}
+
+
+VECTORIZE_MIN = 10_000  # below this importing NumPy costs more than it saves
+
+
+class Descending:
+    __slots__ = ("key",)
+
+    def __init__(self, key):
+        self.key = key
+
+    def __lt__(self, other):
+        return other.key < self.key
+
+
+def select_budget(records, sort_key, budget):
+    """Same result as taking sorted(records, key=sort_key) until the sizes would exceed budget
+
+    Records are consumed one at a time into a max-heap which only keeps the smallest keys whose sizes can
+    still fit, so ordering costs O(n log k) for k selected records instead of sorting all n. This does not
+    bound memory: sort_paths already holds the candidate paths and their metadata for every input.
+    """
+    heap = []  # (Descending((key, i)), record): the largest key is on top
+    total = 0
+    for i, record in enumerate(records):
+        heapq.heappush(heap, (Descending((sort_key(record), i)), record))
+        total += record["size"]
+        # the largest record cannot be selected once everything smaller already exceeds the budget
+        while total - heap[0][1]["size"] > budget:
+            total -= heapq.heappop(heap)[1]["size"]
+
+    return take_budget((record for _, record in sorted(heap, reverse=True)), budget)
+
+
+def take_budget(records, budget):
+    selected = []
+    size_used = 0
+    for record in records:
+        if size_used + record["size"] > budget:
+            break
+        size_used += record["size"]
+        selected.append(record)
+    return selected
+
+
+def vectorized_order(args, data, folder_aggregates):
+    """Indices of data in make_sort_key order, computed one column per sort mode with NumPy
+
+    Returns None when NumPy is not installed.
+    """
+    try:
+        import numpy as np
+    except ModuleNotFoundError:
+        log.info("Sorting %d records without NumPy; install syncweb[fast] to sort large inputs faster", len(data))
+        return None
+
+    n = len(data)
+    num_peers = np.fromiter((d["num_peers"] for d in data), dtype=np.float64, count=n)
+    modified = np.fromiter((d["modified"] for d in data), dtype=np.int64, count=n)
+    size = np.fromiter((d["size"] for d in data), dtype=np.float64, count=n)
+
+    folders = None
+    if any(mode.lstrip("-") in FOLDER_MODES for mode in args.sort):
+        folders = [folder_aggregates.get(os.path.dirname(d["path"].rstrip("/"))) or {} for d in data]
+
+    def aggregate(key):
+        values = (folder.get(key) for folder in folders)  # type: ignore
+        return np.fromiter((np.nan if v is None else v for v in values), dtype=np.float64, count=n)
+
+    keys = []
+    for mode in args.sort:
+        reverse = False
+        if mode.startswith("-"):
+            mode = mode[1:]
+            reverse = True
+
+        match mode:
+            case "peers" | "seeds" | "copies":
+                value = num_peers
+            case "time":
+                value = modified
+            case "date" | "day":
+                value = modified // 86400
+            case "week":
+                value = modified // (86400 * 7)
+            case "month":
+                value = modified // (86400 * 30)
+            case "year":
+                value = modified // (86400 * 365)
+            case "size":
+                value = size
+            case "niche":
+                value = np.abs(num_peers - args.niche)
+            case "frecency":
+                value = num_peers - ((APPLICATION_START - modified) // 86400) / args.frecency_weight
+            case "random":
+                value = np.random.default_rng().random(n)
+            case "folder-size" | "foldersize":
+                value = aggregate("size_sum")
+            case "folder-avg-size" | "folder-size-avg" | "foldersize-avg":
+                value = aggregate("size_median")
+            case "folder-date" | "folderdate":
+                value = aggregate("modified_median") // 86400
+            case "folder-time" | "foldertime":
+                value = aggregate("modified_median")
+            case "count" | "file-count":
+                value = aggregate("file_count")
+            case _:
+                msg = f"mode {mode} not supported"
+                raise ValueError(msg)
+
+        value = value.astype(np.float64)
+        if reverse:
+            value = -value
+        keys.append(np.where(np.isnan(value), np.inf, value))  # missing values sort last, as in make_sort_key
+
+    # np.lexsort is stable and treats its last key as the primary one
+    return np.lexsort(keys[::-1]).tolist()
+
+
 def make_sort_key(args, folder_aggregates):
-    rand_map = {}  # stable random order per file
+    salt = random.random()  # random order which is stable per path within this call
 
     def days_since(modified_time):
         return (APPLICATION_START - modified_time) // 86400
@@ -136,7 +369,7 @@ def make_sort_key(args, folder_aggregates):
                 case "frecency":  # popular + recent
                     value = file_data["num_peers"] - (days_since(file_data["modified"]) / args.frecency_weight)
                 case "random":
-                    value = rand_map.setdefault(id(file_data), random.random())
+                    value = hash((salt, file_data["path"]))
                 case "folder-size" | "foldersize":
                     value = folder_aggregate["size_sum"] if folder_aggregate else None
                 case "folder-avg-size" | "folder-size-avg" | "foldersize-avg":
@@ -161,7 +394,7 @@ def make_sort_key(args, folder_aggregates):
     return sort_key
 
 
-def cmd_sort(args) -> None:
+def sort_paths(args) -> list[str]:
     if not args.sort:
         args.sort = ["-niche", "-frecency"]
     args.sort = [s.lower() for s in args.sort]
@@ -170,7 +403,7 @@ def cmd_sort(args) -> None:
 
     args.min_depth, args.max_depth = parse_depth_constraints(args.depth, args.min_depth, args.max_depth)
 
-    data = []
+    candidates = []
     for path in args.paths:
         abs_path = Path(path).absolute()
         folder_id, file_path = path2fid(args, abs_path)
@@ -183,56 +416,78 @@ def cmd_sort(args) -> None:
             # TODO: stat of Syncthing folder root?
             continue
 
-        file_data = args.st.file(folder_id, file_path.rstrip("/"))
-
-        if not file_data:
-            log.error("%s: No such file or directory", shlex.quote(path))
-            continue
-
-        file_data["num_peers"] = len(file_data.pop("availability", None) or [])
-        if args.min_seeders and file_data["num_peers"] < args.min_seeders:
-            continue
-        if args.max_seeders is not None and args.max_seeders < file_data["num_peers"]:
-            continue
-
-        file_data_global = file_data.pop("global", None) or {}
-        file_data_local = file_data.pop("local", None) or {}
-        file_data = file_data | file_data_local | file_data_global
-        file_data.pop("platform", None)
-        file_data.pop("blocksHash", None)  # TODO: rolling hash? or only good for exact duplicates
-        file_data.pop("noPermissions", None)
-        file_data.pop("localFlags", None)
-        file_data.pop("numBlocks", None)
-        file_data.pop("version", None)
-        file_data.pop("type", None)
-        file_data.pop("name", None)
-        file_data.pop("invalid", None)
-        file_data.pop("inodeChange", None)
-
-        # TODO: could be interesting to sort with:
-        file_data.pop("modifiedBy", None)
-        file_data.pop("sequence", None)
-        file_data.pop("previousBlocksHash", None)
-        file_data.pop("mustRescan", None)
-        file_data.pop("ignored", None)
-        file_data.pop("deleted", None)
-
-        file_data["path"] = path
-        file_data["modified"] = str_utils.isodate2seconds(file_data["modified"])
-        data.append(file_data)
-
-    folder_aggregates = aggregate_folders(
-        data, ["modified_median", "size_median", "size_sum"], args.min_depth, args.max_depth
-    )
-
-    data = sorted(data, key=make_sort_key(args, folder_aggregates))
-    SIZE_USED = 0
-    for d in data:
+        candidates.append((path, folder_id, file_path.rstrip("/")))
+
+    by_folder = {}
+    for _path, folder_id, file_path in candidates:
+        by_folder.setdefault(folder_id, []).append(file_path)
+
+    metadata = {}
+    for folder_id, file_paths in by_folder.items():
+        meta = args.st.indexed_files_meta(folder_id, file_paths)
+        # availability is not part of db/browse
+        stale = [file_path for file_path, entry in meta.items() if entry and entry.get("num_peers") is None]
+        checked = {}
+        for file_path, file_data in args.st.files_detail(folder_id, stale).items():
+            if not file_data:
+                meta[file_path] = None
+                continue
+            meta[file_path]["num_peers"] = checked[file_path] = len(file_data.get("availability") or [])
+        args.st.index.set_num_peers_many(folder_id, checked)
+        metadata[folder_id] = meta
+
+    def records():
+        for path, folder_id, file_path in candidates:
+            entry = metadata[folder_id][file_path]
+            if not entry:
+                log.error("%s: No such file or directory", shlex.quote(path))
+                continue
+            num_peers = entry["num_peers"]
+
+            if args.min_seeders and num_peers < args.min_seeders:
+                continue
+            if args.max_seeders is not None and args.max_seeders < num_peers:
+                continue
+
+            # TODO: could be interesting to sort with: modifiedBy, sequence, blocksHash
+            yield {
+                "path": path,
+                "num_peers": num_peers,
+                "size": entry["size"],
+                "modified": str_utils.isodate2seconds(entry["modTime"]),
+            }
+
+    data = records()
+    folder_aggregates = {}
+    if any(mode.lstrip("-") in FOLDER_MODES for mode in args.sort):
+        # folder aggregates need every record before any key can be computed
+        data = list(data)
+        folder_aggregates = aggregate_folders(
+            data,
+            ["modified_median", "size_median", "size_sum"],
+            args.min_depth,
+            args.max_depth,
+            exact=args.exact_median,
+        )
+    sort_key = make_sort_key(args, folder_aggregates)
+
+    order = None
+    if isinstance(data, list) or not args.limit_size:
+        data = list(data)
+        if len(data) >= VECTORIZE_MIN:
+            order = vectorized_order(args, data, folder_aggregates)
+
+    if order is not None:
+        data = [data[i] for i in order]
         if args.limit_size:
-            file_size = d["size"]
-            if SIZE_USED + file_size > args.limit_size:
-                break
-            SIZE_USED += file_size
+            data = take_budget(data, args.limit_size)
+    elif args.limit_size:
+        data = select_budget(data, sort_key, args.limit_size)
+    else:
+        data = sorted(data, key=sort_key)
+    return [d["path"] for d in data]
 
-        # print(make_sort_key(args, folder_aggregates)(d), d["path"])
-        pipe_print(d["path"])
+
+def cmd_sort(args) -> None:
+    for path in sort_paths(args):
+        pipe_print(path)
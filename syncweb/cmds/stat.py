@@ -139,6 +139,7 @@ def cmd_stat(args) -> None:
     else:
         args.time_format = "human"
 
+    resolved = []
     for path in args.paths:
         abs_path = Path(path).resolve()
         folder_id, file_path = path2fid(args, abs_path)
@@ -151,8 +152,9 @@ def cmd_stat(args) -> None:
             # TODO: stat of Syncthing folder root?
             continue
 
-        file_data = args.st.file(folder_id, file_path.rstrip("/"))
+        resolved.append((path, folder_id, file_path.rstrip("/")))
 
+    for (path, _folder_id, _file_path), file_data in args.st.gather(lambda r: args.st.file(r[1], r[2]), resolved):
         if not file_data:
             log.error("%s: No such file or directory", shlex.quote(path))
             continue
@@ -56,6 +56,7 @@ if sys.platform.startswith("win"):
 else:
     EXE_NAME = "syncthing"
 DEST_PATH = os.path.join(consts.SCRIPT_DIR, EXE_NAME)
+VERSION_CACHE_NAME = "syncthing-version.json"
 
 
 def find_syncthing_bin():
@@ -174,13 +175,47 @@ def extract_syncthing_zip(archive, dest_path):
     raise RuntimeError("No syncthing binary found in ZIP archive.")
 
 
-def ensure_syncthing():
+def binary_key(path):
+    stat = os.stat(path)
+    return [os.path.realpath(path), stat.st_mtime_ns, stat.st_size, stat.st_ino]
+
+
+def probe_version(path):
+    out = subprocess.check_output([path, "--version"], text=True)
+    m = re.search(r"v(\d+\.\d+\.\d+)", out)
+    if m:
+        return m.group(1)
+    return None
+
+
+def cached_probe_version(path, cache_dir=None):
+    if cache_dir is None:
+        return probe_version(path)
+
+    cache_path = os.path.join(cache_dir, VERSION_CACHE_NAME)
+    key = binary_key(path)
+    with suppress(OSError, ValueError, KeyError, TypeError):
+        with open(cache_path) as f:
+            cache = json.load(f)
+        if cache["key"] == key:
+            return cache["version"]
+
+    version = probe_version(path)
+    if version:
+        with suppress(OSError):
+            tmp_path = cache_path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({"key": key, "version": version}, f)
+            os.replace(tmp_path, cache_path)
+    return version
+
+
+def ensure_syncthing(cache_dir=None):
     existing_path = find_syncthing_bin()
     with suppress(FileNotFoundError, subprocess.CalledProcessError):
-        out = subprocess.check_output([existing_path, "--version"], text=True)
-        m = re.search(r"v(\d+\.\d+\.\d+)", out)
-        if m:
-            current_version = Version(m.group(1))
+        version = cached_probe_version(existing_path, cache_dir)
+        if version:
+            current_version = Version(version)
             if current_version and current_version >= MIN_VERSION:
                 return existing_path
 
@@ -0,0 +1,155 @@
+import threading
+
+from syncweb.index import folder_signature
+from syncweb.log_utils import log
+
+INDEX_EVENTS = (
+    "LocalIndexUpdated",
+    "RemoteIndexUpdated",
+    "RemoteChangeDetected",
+    "ItemFinished",
+    "FolderSummary",
+    "ConfigSaved",
+)
+MAX_DELTA_PATHS = 2000  # more changed paths than this in one batch: cheaper to rebuild the folder
+
+
+class EventWatcher:
+    """Keep a FileIndex current by applying deltas from Syncthing's /rest/events long-poll
+
+    The last seen event ID and Syncthing's startTime are persisted in the index so that short-lived
+    CLI invocations can catch up on what happened in between. A gap in event IDs (the event buffer
+    overflowed) or a Syncthing restart invalidates the whole index instead.
+    """
+
+    def __init__(self, st, index, event_types=INDEX_EVENTS):
+        self.st = st
+        self.index = index
+        self.event_types = event_types
+        self.since = 0
+        self.synced = False
+        self.listeners = []  # callables receiving each batch of events after it is applied
+        self.thread: threading.Thread | None = None
+
+    def restore(self):
+        start_time = self.st.status().get("startTime")
+        event_types = list(self.event_types)
+        known = (self.index.get_meta("syncthing_start_time"), self.index.get_meta("event_types"))
+        if known != (start_time, event_types):
+            log.info("Syncthing restarted since last run; the index will be rebuilt")
+            self.index.invalidate()
+            self.index.set_meta("syncthing_start_time", start_time)
+            self.index.set_meta("event_types", event_types)
+            self.save_since(0)
+        else:
+            self.since = self.index.get_meta("last_event_id", 0)
+
+    def save_since(self, since):
+        self.since = since
+        self.index.set_meta("last_event_id", since)
+
+    def poll(self, timeout=60):
+        events = self.st.events(since=self.since, timeout=timeout, event_types=self.event_types)
+        if events and self.since and events[0]["id"] > self.since + 1:
+            log.info("Missed events %s to %s; the index will be rebuilt", self.since + 1, events[0]["id"] - 1)
+            self.index.invalidate()
+        return events
+
+    def catch_up(self):
+        if self.synced:
+            return  # already caught up during this process or kept current by the background thread
+        self.restore()
+
+        while True:
+            events = self.poll(timeout=0)
+            if not events:
+                break
+            self.apply(events)
+
+        self.synced = True
+        self.index.tracking = True
+
+    def apply(self, events):
+        lookups = {}  # (folder_id, path) -> None
+        for event in events:
+            data = event.get("data") or {}
+            folder_id = data.get("folder")
+
+            match event["type"]:
+                case "LocalIndexUpdated":
+                    for path in data.get("filenames") or []:
+                        lookups[(folder_id, path)] = None
+                case "RemoteChangeDetected":
+                    lookups[(data.get("folderID") or folder_id, data["path"])] = None
+                case "RemoteIndexUpdated":
+                    # availability of files in this folder may have changed. The event does not say which
+                    # files changed and remote additions to ignored files never produce RemoteChangeDetected,
+                    # so the folder is also browsed again once REBROWSE_INTERVAL has passed
+                    self.index.clear_num_peers(folder_id)
+                    self.index.mark_remote_changed(folder_id)
+                case "ItemFinished":
+                    if not data.get("error"):
+                        lookups[(folder_id, data["item"])] = None
+                case "FolderSummary":
+                    # flush pending lookups first so the stored signature matches the indexed rows.
+                    # set_signature leaves folders alone whose deltas were not all applied
+                    self.lookup(lookups)
+                    lookups = {}
+                    self.index.set_signature(folder_id, folder_signature(data.get("summary") or {}))
+
+        self.lookup(lookups)
+        self.save_since(events[-1]["id"])
+
+        for listener in self.listeners:
+            listener(events)
+
+    def lookup(self, lookups):
+        folder_counts = {}
+        for folder_id, _path in lookups:
+            folder_counts[folder_id] = folder_counts.get(folder_id, 0) + 1
+        large_folders = {k for k, v in folder_counts.items() if v > MAX_DELTA_PATHS}
+        for folder_id in large_folders:
+            self.index.invalidate(folder_id)
+
+        indexed = {folder_id for folder_id in folder_counts if self.index.signature(folder_id) is not None}
+        lookups = [k for k in lookups if k[0] in indexed and k[0] not in large_folders]  # others will be rebuilt
+
+        for (folder_id, path), file_data in self.st.gather(lambda k: self.st.file(*k), lookups):
+            self.apply_file(folder_id, path, file_data)
+
+    def apply_file(self, folder_id, path, file_data):
+        entry = (file_data or {}).get("global")
+        if not entry or entry.get("deleted"):
+            self.index.delete(folder_id, path)
+        else:
+            self.index.upsert(folder_id, path, entry.get("type", ""), entry.get("size", 0), entry.get("modified", ""))
+
+    def run(self, shutdown: threading.Event, timeout=60):
+        if not self.synced:
+            self.restore()
+        self.synced = True
+        self.index.tracking = True
+
+        delay = 1
+        while not shutdown.is_set():
+            try:
+                events = self.poll(timeout=timeout)
+                delay = 1
+            except Exception as e:
+                log.debug("Error polling events %s", e)
+                if shutdown.wait(delay):
+                    break
+                delay = min(delay * 2, 60)
+                continue
+
+            if events:
+                try:
+                    self.apply(events)
+                except Exception as e:
+                    log.warning("Failed to apply events: %s", e)
+                    self.index.invalidate()
+
+    def start(self, shutdown: threading.Event):
+        self.thread = threading.Thread(target=self.run, args=(shutdown,), name="syncweb-events", daemon=True)
+        self.thread.start()
+        return self.thread
@@ -0,0 +1,122 @@
+import heapq
+
+from syncweb.log_utils import log
+
+GLOB_CHARS = frozenset("*?[]{}\\")
+MANAGED_HEADER = "// Syncweb-managed"
+
+
+def is_literal_unignore(line: str) -> bool:
+    return line.startswith("!/") and not GLOB_CHARS.intersection(line)
+
+
+def compact_unignores(lines, list_children=None, dirty=None) -> list[str]:
+    """Shrink a set of "!/path" lines without changing which existing files they select
+
+    - directories whose children are all unignored are replaced by one line for the directory,
+      deepest first so that parents can collapse in turn; list_children(dir) returns the set of child
+      names of a directory or None if unknown
+    - lines already covered by an unignored parent directory are dropped
+
+    Lines with glob characters are kept as they are. When dirty is given only the ancestors of those paths
+    are considered for collapsing, e.g. when the other lines were compacted before.
+    """
+    paths = set()
+    others = []
+    for line in lines:
+        if is_literal_unignore(line) and line.strip("!/"):
+            paths.add(line[2:].strip("/"))
+        else:
+            others.append(line)
+
+    if list_children is not None:
+        by_parent: dict[str, set[str]] = {}
+        for path in paths:
+            parent, _, name = path.rpartition("/")
+            if parent:
+                by_parent.setdefault(parent, set()).add(name)
+
+        if dirty is None:
+            candidates = set(by_parent)
+        else:
+            candidates = {p.strip("/").rpartition("/")[0] for p in dirty} & set(by_parent)
+        queue = [(-parent.count("/"), parent) for parent in candidates]
+        heapq.heapify(queue)
+        while queue:
+            _, directory = heapq.heappop(queue)
+            if directory in paths:
+                continue
+            children = list_children(directory)
+            if not children or not children <= by_parent[directory]:
+                continue
+
+            paths.add(directory)
+            parent, _, name = directory.rpartition("/")
+            if parent:
+                if parent not in by_parent:
+                    by_parent[parent] = set()
+                    heapq.heappush(queue, (-parent.count("/"), parent))
+                by_parent[parent].add(name)
+
+    kept = []
+    for path in sorted(paths):
+        parent = path.rpartition("/")[0]
+        while parent and parent not in paths:
+            parent = parent.rpartition("/")[0]
+        if not parent:
+            kept.append("!/" + path)
+
+    return kept + others
+
+
+class IgnoreState:
+    """A folder's Syncweb-managed ignore lines together with the last known server copy
+
+    Unignores are queued with add() and written by flush(), which posts only if the rendered list differs
+    from what the server already has. Lines compacted by a previous flush are not re-examined.
+    """
+
+    def __init__(self, folder_id: str, server_lines: list[str]):
+        self.folder_id = folder_id
+        self.server_lines = list(server_lines)
+        self.unignores = {s for s in server_lines if s.startswith("!")}
+        self.others = {s for s in server_lines if not s.startswith("!") and s not in (MANAGED_HEADER, "*")}
+        self.pending: set[str] = set()
+        self.compacted = False
+
+    def add(self, paths) -> int:
+        added = 0
+        for p in paths:
+            if p.startswith("//"):
+                continue
+            if not p.startswith("!/"):
+                p = "!/" + p
+            if p not in self.unignores and p not in self.pending:
+                self.pending.add(p)
+                added += 1
+        return added
+
+    def render(self, list_children=None) -> tuple[list[str], list[str]]:
+        dirty = None if not self.compacted else {p[2:] for p in self.pending}
+        compacted = compact_unignores(self.unignores | self.pending, list_children, dirty)
+        lines = [MANAGED_HEADER] + sorted(compacted) + sorted(self.others) + ["*"]
+        return lines, compacted
+
+    def flush(self, st, list_children=None) -> bool:
+        """Write pending changes; returns False if the server copy is already up to date"""
+        lines, compacted = self.render(list_children)
+        before = len(self.unignores) + len(self.pending)
+        self.unignores = set(compacted)
+        self.pending.clear()
+        self.compacted = True
+
+        if lines == self.server_lines:
+            return False
+
+        if len(compacted) < before:
+            log.info("[%s] Compacted %d unignore lines to %d", self.folder_id, before, len(compacted))
+        old = set(self.server_lines)
+        log.debug("[%s] ignores: +%d -%d lines", self.folder_id, len(set(lines) - old), len(old - set(lines)))
+        st.set_ignores(self.folder_id, lines=lines)
+        self.server_lines = lines
+        return True
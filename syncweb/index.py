@@ -0,0 +1,322 @@
+import json, sqlite3, threading, time
+from pathlib import Path
+
+from syncweb.log_utils import log
+
+# db/status fields which change whenever the global tree of a folder changes
+SIGNATURE_KEYS = (
+    "sequence",
+    "version",
+    "globalFiles",
+    "globalDirectories",
+    "globalSymlinks",
+    "globalDeleted",
+    "globalBytes",
+)
+AVAILABILITY_TTL = 3600
+REBROWSE_INTERVAL = 300  # a folder changed by peers is browsed again at most this often
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS folders (
+    folder_id TEXT PRIMARY KEY,
+    signature TEXT,
+    updated INTEGER
+);
+CREATE TABLE IF NOT EXISTS files (
+    folder_id TEXT NOT NULL,
+    path TEXT NOT NULL,
+    parent TEXT NOT NULL,
+    name TEXT NOT NULL,
+    depth INTEGER NOT NULL,
+    type TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mod_time TEXT NOT NULL,
+    num_peers INTEGER,
+    peers_checked INTEGER,
+    PRIMARY KEY (folder_id, path)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS files_parent ON files (folder_id, parent);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def folder_signature(status: dict) -> str:
+    return json.dumps([status.get(k) for k in SIGNATURE_KEYS])
+
+
+def normalize_prefix(prefix: str | None) -> str:
+    if not prefix:
+        return ""
+    return prefix.strip("/")
+
+
+def split_path(path: str) -> tuple[str, str, int]:
+    parent, _, name = path.rpartition("/")
+    return parent, name, path.count("/")
+
+
+def walk_browse(items, parent="", depth=0):
+    for item in items:
+        name = item.get("name", "")
+        path = f"{parent}/{name}" if parent else name
+        yield path, parent, depth, item
+        if item.get("children"):
+            yield from walk_browse(item["children"], path, depth + 1)
+
+
+class FileIndex:
+    """Local SQLite mirror of Syncthing's db/browse tree; one row per file or directory"""
+
+    def __init__(self, db_path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.lock = threading.RLock()
+        self.fresh: set[str] = set()  # folders already validated during this process
+        self.tracking = False  # set by EventWatcher while the index is kept current via /rest/events
+
+    def close(self):
+        self.conn.close()
+
+    def get_meta(self, key: str, default=None):
+        with self.lock:
+            row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set_meta(self, key: str, value):
+        with self.lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, json.dumps(value)))
+
+    def signature(self, folder_id: str) -> str | None:
+        with self.lock:
+            row = self.conn.execute("SELECT signature FROM folders WHERE folder_id = ?", (folder_id,)).fetchone()
+        return row[0] if row else None
+
+    def remote_changed(self) -> dict[str, int]:
+        """Folders whose global tree peers changed in ways the event stream does not describe"""
+        return self.get_meta("remote_changed", {})
+
+    def mark_remote_changed(self, folder_id: str):
+        with self.lock:
+            changed = self.remote_changed()
+            if folder_id not in changed:
+                changed[folder_id] = int(time.time())
+                self.set_meta("remote_changed", changed)
+            self.fresh.discard(folder_id)
+
+    def clear_remote_changed(self, folder_id: str):
+        with self.lock:
+            changed = self.remote_changed()
+            if changed.pop(folder_id, None) is not None:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", ("remote_changed", json.dumps(changed))
+                )
+
+    def updated(self, folder_id: str) -> int:
+        with self.lock:
+            row = self.conn.execute("SELECT updated FROM folders WHERE folder_id = ?", (folder_id,)).fetchone()
+        return row[0] if row and row[0] else 0
+
+    def set_signature(self, folder_id: str, signature: str):
+        if folder_id in self.remote_changed():
+            return  # the rows may be missing remote changes, so they do not match this signature
+        with self.lock, self.conn:
+            self.conn.execute(
+                "UPDATE folders SET signature = ?, updated = ? WHERE folder_id = ? AND signature IS NOT NULL",
+                (signature, int(time.time()), folder_id),
+            )
+
+    def check(self, st, folder_id: str, force=False) -> str | None:
+        """Returns the folder's current signature if its rows need to be rebuilt"""
+        if folder_id in self.fresh and not force:
+            return None
+
+        if self.tracking and not force and self.signature(folder_id) is not None:
+            if folder_id not in self.remote_changed():
+                # deltas have been applied from the event stream; no need to ask db/status
+                self.fresh.add(folder_id)
+                return None
+            if time.time() - self.updated(folder_id) < REBROWSE_INTERVAL:
+                return None  # serve the current rows; peers' changes are picked up by a later browse
+
+        signature = folder_signature(st.folder_status(folder_id))
+        if not force and signature == self.signature(folder_id):
+            with self.lock, self.conn:
+                self.clear_remote_changed(folder_id)
+            self.fresh.add(folder_id)
+            return None
+        return signature
+
+    def refresh(self, st, folder_id: str, force=False) -> bool:
+        signature = self.check(st, folder_id, force)
+        if signature is None:
+            return False
+
+        self.rebuild_entries(folder_id, st.files_iter(folder_id), signature)
+        self.fresh.add(folder_id)
+        return True
+
+    def rebuild(self, folder_id: str, items, signature: str | None):
+        self.rebuild_entries(folder_id, walk_browse(items or []), signature)
+
+    def rebuild_entries(self, folder_id: str, entries, signature: str | None, batch_size=5000) -> int:
+        """Replace the rows of a folder from (path, parent, depth, item) entries; returns the number of rows
+
+        The rows are committed only once entries is exhausted; an error while reading them rolls back.
+        """
+        start = time.monotonic()
+        insert = """INSERT OR REPLACE INTO files (folder_id, path, parent, name, depth, type, size, mod_time)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)"""
+        count = 0
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM files WHERE folder_id = ?", (folder_id,))
+            rows = []
+            for path, parent, depth, item in entries:
+                count += 1
+                rows.append(
+                    (folder_id, path, parent, item.get("name", ""), depth)
+                    + (item.get("type", ""), item.get("size", 0), item.get("modTime", ""))
+                )
+                if len(rows) >= batch_size:
+                    self.conn.executemany(insert, rows)
+                    rows = []
+            self.conn.executemany(insert, rows)
+            self.conn.execute(
+                "INSERT OR REPLACE INTO folders (folder_id, signature, updated) VALUES (?, ?, ?)",
+                (folder_id, signature, int(time.time())),
+            )
+            self.clear_remote_changed(folder_id)
+        log.info("Indexed folder %s in %.2fs", folder_id, time.monotonic() - start)
+        return count
+
+    def invalidate(self, folder_id: str | None = None):
+        with self.lock, self.conn:
+            if folder_id is None:
+                self.fresh.clear()
+                self.conn.execute("UPDATE folders SET signature = NULL")
+            else:
+                self.fresh.discard(folder_id)
+                self.conn.execute("UPDATE folders SET signature = NULL WHERE folder_id = ?", (folder_id,))
+
+    def upsert(self, folder_id: str, path: str, type_: str, size: int, mod_time: str):
+        path = normalize_prefix(path)
+        parent, name, depth = split_path(path)
+        with self.lock, self.conn:
+            self.conn.execute(
+                """INSERT OR REPLACE INTO files (folder_id, path, parent, name, depth, type, size, mod_time)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                (folder_id, path, parent, name, depth, type_, size, mod_time),
+            )
+
+    def delete(self, folder_id: str, path: str):
+        path = normalize_prefix(path)
+        with self.lock, self.conn:
+            self.conn.execute(
+                "DELETE FROM files WHERE folder_id = ? AND (path = ? OR (path > ? AND path < ?))",
+                (folder_id, path, path + "/", path + "0"),
+            )
+
+    def clear_num_peers(self, folder_id: str, path: str | None = None):
+        with self.lock, self.conn:
+            if path is None:
+                self.conn.execute("UPDATE files SET peers_checked = NULL WHERE folder_id = ?", (folder_id,))
+            else:
+                self.conn.execute(
+                    "UPDATE files SET peers_checked = NULL WHERE folder_id = ? AND path = ?",
+                    (folder_id, normalize_prefix(path)),
+                )
+
+    def rows(self, folder_id: str, prefix: str | None = None, levels: int | None = None):
+        prefix = normalize_prefix(prefix)
+
+        sql = "SELECT path, parent, name, type, size, mod_time FROM files WHERE folder_id = ?"
+        params: list = [folder_id]
+        if prefix:
+            # primary key range scan over everything below prefix/ ("0" sorts right after "/")
+            sql += " AND path > ? AND path < ?"
+            params.extend([prefix + "/", prefix + "0"])
+        if levels is not None:
+            sql += " AND depth <= ?"
+            params.append(levels + (prefix.count("/") + 1 if prefix else 0))
+        sql += " ORDER BY path"
+
+        return self.conn.execute(sql, params)
+
+    def entries(self, folder_id: str, prefix: str | None = None, levels: int | None = None, batch_size=5000):
+        """Stream (path, parent, depth, item) rows in path order without loading the whole folder"""
+        with self.lock:
+            cursor = self.rows(folder_id, prefix, levels)
+        while True:
+            with self.lock:
+                rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            for path, parent, name, type_, size, mod_time in rows:
+                yield path, parent, path.count("/"), {"name": name, "modTime": mod_time, "size": size, "type": type_}
+
+    def files(self, folder_id: str, prefix: str | None = None, levels: int | None = None) -> list[dict]:
+        """Same shape as SyncthingNode.files(); directories without children have no "children" key"""
+        prefix = normalize_prefix(prefix)
+
+        top = []
+        entries = {prefix: {"children": top}}
+        with self.lock:
+            rows = self.rows(folder_id, prefix, levels).fetchall()
+        for path, parent, name, type_, size, mod_time in rows:
+            entry = {"name": name, "modTime": mod_time, "size": size, "type": type_}
+            entries[path] = entry
+
+            parent_entry = entries.get(parent)
+            if parent_entry is not None:
+                parent_entry.setdefault("children", []).append(entry)
+        return top
+
+    def file(self, folder_id: str, path: str) -> dict | None:
+        return self.files_meta(folder_id, [path])[path]
+
+    def files_meta(self, folder_id: str, paths, batch_size=500) -> dict:
+        """{path: {name, type, size, modTime, num_peers} or None}; num_peers is None if stale or never checked"""
+        keys = {path: normalize_prefix(path) for path in paths}
+        rows = {}
+        normalized = list(set(keys.values()))
+        for i in range(0, len(normalized), batch_size):
+            batch = normalized[i : i + batch_size]
+            with self.lock:
+                rows.update(
+                    (row[0], row[1:])
+                    for row in self.conn.execute(
+                        f"""SELECT path, name, type, size, mod_time, num_peers, peers_checked FROM files
+                        WHERE folder_id = ? AND path IN ({",".join("?" * len(batch))})""",
+                        [folder_id, *batch],
+                    )
+                )
+
+        now = time.time()
+        meta = {}
+        for path, key in keys.items():
+            row = rows.get(key)
+            if row is None:
+                meta[path] = None
+                continue
+            name, type_, size, mod_time, num_peers, peers_checked = row
+            if peers_checked is None or now - peers_checked > AVAILABILITY_TTL:
+                num_peers = None
+            meta[path] = {"name": name, "type": type_, "size": size, "modTime": mod_time, "num_peers": num_peers}
+        return meta
+
+    def set_num_peers(self, folder_id: str, path: str, num_peers: int):
+        self.set_num_peers_many(folder_id, {path: num_peers})
+
+    def set_num_peers_many(self, folder_id: str, num_peers: dict[str, int]):
+        now = int(time.time())
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "UPDATE files SET num_peers = ?, peers_checked = ? WHERE folder_id = ? AND path = ?",
+                [(n, now, folder_id, normalize_prefix(path)) for path, n in num_peers.items()],
+            )
@@ -0,0 +1,164 @@
+import codecs, json, re
+from json.decoder import scanstring
+
+WHITESPACE = re.compile(r"[ \t\n\r]*")
+SCALAR = re.compile(r"-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][-+]?\d+)?|true|false|null")
+DELIMITERS = frozenset(" \t\n\r,]}")
+LITERALS = {"true": True, "false": False, "null": None}
+
+decoder = json.JSONDecoder()
+
+
+class Tokenizer:
+    """Incremental JSON tokenizer over an iterable of bytes or str chunks
+
+    Only the unconsumed tail of the current chunk is kept in memory. Objects which arrive complete within
+    the buffer can be decoded in one go with take_value() instead of token by token.
+    """
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.utf8 = codecs.getincrementaldecoder("utf-8")()
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        for chunk in self.chunks:
+            if isinstance(chunk, bytes):
+                chunk = self.utf8.decode(chunk)
+            if chunk:
+                self.buf = self.buf[self.pos :] + chunk
+                self.pos = 0
+                return True
+        if not self.eof:
+            self.eof = True
+            self.buf = self.buf[self.pos :] + self.utf8.decode(b"", final=True)
+            self.pos = 0
+        return False
+
+    def peek(self) -> str:
+        while True:
+            self.pos = WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                raise ValueError("unexpected end of JSON stream")
+
+    def expect(self, c: str):
+        if self.peek() != c:
+            raise ValueError(f"expected {c!r} at {self.buf[self.pos:self.pos + 20]!r}")
+        self.pos += 1
+
+    def take_value(self, complete_only=False):
+        """Decode the next value; with complete_only=True return (False, None) unless it is already buffered"""
+        while True:
+            self.peek()
+            try:
+                value, end = decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if complete_only or not self.fill():
+                    if complete_only:
+                        return False, None
+                    raise
+                continue
+            if self.buf[self.pos] not in '{["' and not self.eof:
+                # a number at the end of the buffer might continue in the next chunk
+                if (end == len(self.buf) or self.buf[end] not in DELIMITERS) and self.fill():
+                    continue
+            self.pos = end
+            return True, value
+
+    def take_string(self) -> str:
+        self.expect('"')
+        while True:
+            try:
+                s, end = scanstring(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if not self.fill():
+                    raise
+                continue
+            self.pos = end
+            return s
+
+    def take_scalar(self):
+        if self.peek() == '"':
+            return self.take_string()
+        while True:
+            m = SCALAR.match(self.buf, self.pos)
+            # the value might continue in the next chunk unless it is followed by a delimiter
+            if m and (self.eof or (m.end() < len(self.buf) and self.buf[m.end()] in DELIMITERS)):
+                self.pos = m.end()
+                s = m.group()
+                if s in LITERALS:
+                    return LITERALS[s]
+                return json.loads(s)
+            if not self.fill():
+                if m:
+                    continue  # now at eof
+                raise ValueError(f"invalid JSON value at {self.buf[self.pos:self.pos + 20]!r}")
+
+    def next_in(self, close: str) -> bool:
+        """Consume a separator or the closing bracket; returns False at the end of the container"""
+        c = self.peek()
+        if c == close:
+            self.pos += 1
+            return False
+        if c == ",":
+            self.pos += 1
+        return True
+
+
+def iter_browse(chunks):
+    """Stream a db/browse response as (path, parent, depth, item) tuples, same as index.walk_browse
+
+    A directory is yielded when its "children" key is reached, so Syncthing's key order (children last)
+    means parents come before their children and items never hold their subtree.
+    """
+    tokens = Tokenizer(chunks)
+    if tokens.peek() != "[":
+        _ok, value = tokens.take_value()
+        if value:  # {} on 404
+            raise ValueError(f"unexpected db/browse response: {str(value)[:100]}")
+        return
+    tokens.expect("[")
+    yield from _iter_entries(tokens, "", 0)
+
+
+def _iter_entries(tokens: Tokenizer, parent: str, depth: int):
+    while tokens.next_in("]"):
+        ok, item = tokens.take_value(complete_only=True)
+        if ok:
+            # whole subtree is already buffered: decode it in C
+            yield from _walk(item, parent, depth)
+            continue
+
+        tokens.expect("{")
+        item = {}
+        yielded = False
+        while tokens.next_in("}"):
+            key = tokens.take_string()
+            tokens.expect(":")
+            if key == "children" and tokens.peek() == "[":
+                tokens.expect("[")
+                path = f"{parent}/{item.get('name', '')}" if parent else item.get("name", "")
+                yield path, parent, depth, item
+                yielded = True
+                yield from _iter_entries(tokens, path, depth + 1)
+            elif tokens.peek() in "{[":
+                item[key] = tokens.take_value()[1]
+            else:
+                item[key] = tokens.take_scalar()
+
+        if not yielded:
+            path = f"{parent}/{item.get('name', '')}" if parent else item.get("name", "")
+            yield path, parent, depth, item
+
+
+def _walk(item: dict, parent: str, depth: int):
+    children = item.pop("children", None)
+    name = item.get("name", "")
+    path = f"{parent}/{name}" if parent else name
+    yield path, parent, depth, item
+    for child in children or []:
+        yield from _walk(child, path, depth + 1)
@@ -1,7 +1,4 @@
-import argparse, logging, os, sys
-
-from IPython.core import ultratb
-from IPython.terminal import debugger
+import argparse, logging, os, sys, threading
 
 
 def check_stdio():
@@ -15,6 +12,12 @@ def check_stdio():
 
 has_stdin, has_stdout = check_stdio()
 is_terminal = has_stdin and has_stdout
+client = threading.local()  # set by the Syncweb server in the thread running a client's command
+
+
+def in_terminal() -> bool:
+    """is_terminal of the process whose stdout the current command writes to"""
+    return getattr(client, "is_terminal", is_terminal)
 
 
 def format_args(pargs, kwargs):
@@ -35,6 +38,9 @@ def clamp_index(arr, idx):
     return arr[min(max(idx, 0), len(arr) - 1)]
 
 
+LOG_LEVELS = [logging.WARNING, logging.INFO, logging.DEBUG]
+
+
 def argparse_log() -> logging.Logger:
     parser = argparse.ArgumentParser(add_help=False)
     parser.add_argument("--verbose", "-v", action="count", default=0)
@@ -42,6 +48,10 @@ def argparse_log() -> logging.Logger:
     args, _unknown = parser.parse_known_args()
 
     if args.verbose > 0 and has_stdin and has_stdout:
+        # IPython is slow to import; only load it when the debugger hooks are installed
+        from IPython.core import ultratb
+        from IPython.terminal import debugger
+
         sys.breakpointhook = debugger.set_trace
         if not args.no_pdb:
             sys.excepthook = ultratb.FormattedTB(
@@ -51,19 +61,17 @@ def argparse_log() -> logging.Logger:
                 debugger_cls=debugger.TerminalPdb,
             )
 
-    log_levels = [logging.WARNING, logging.INFO, logging.DEBUG]
-
     if args.verbose > 3 or args.verbose == 0:
         logging.root.handlers = []  # clear any existing handlers
         logging.basicConfig(
-            level=clamp_index(log_levels, args.verbose),
+            level=clamp_index(LOG_LEVELS, args.verbose),
             format="%(message)s",
         )
     else:
         logging.basicConfig(format="%(message)s")
 
     logger = logging.getLogger("syncweb")
-    logger.setLevel(clamp_index(log_levels, args.verbose))
+    logger.setLevel(clamp_index(LOG_LEVELS, args.verbose))
     return logger
 
 
@@ -0,0 +1,90 @@
+import os, re, shutil
+from pathlib import Path
+
+MOUNTINFO = "/proc/self/mountinfo"
+OCTAL_ESCAPE = re.compile(r"\\([0-7]{3})")
+
+
+def unescape(field: str) -> str:
+    # mountinfo escapes space, tab, newline and backslash as \040 \011 \012 \134
+    return OCTAL_ESCAPE.sub(lambda m: chr(int(m.group(1), 8)), field)
+
+
+def parse_mountinfo(text: str) -> list[tuple[int, str, str]]:
+    """(st_dev, mountpoint, fstype) for each line of /proc/<pid>/mountinfo"""
+    mounts = []
+    for line in text.splitlines():
+        fields = line.split()
+        if len(fields) < 7 or "-" not in fields[6:]:
+            continue
+        major, _, minor = fields[2].partition(":")
+        fstype = fields[fields.index("-", 6) + 1]
+        mounts.append((os.makedev(int(major), int(minor)), unescape(fields[4]), fstype))
+    return mounts
+
+
+def is_within(path: str, mountpoint: str) -> bool:
+    return path == mountpoint or path.startswith(mountpoint.rstrip("/") + "/")
+
+
+class MountTable:
+    """Maps paths to their mountpoint and disk usage with one stat per path and one statvfs per filesystem
+
+    The mount table is read once from /proc/self/mountinfo. Where that is not available (not Linux), or
+    the device is not listed (e.g. btrfs subvolumes report anonymous device numbers), the mountpoint is
+    found by walking up the parents once per device.
+    """
+
+    def __init__(self, mountinfo=MOUNTINFO):
+        self.by_device: dict[int, list[str]] = {}
+        try:
+            text = Path(mountinfo).read_text()
+        except OSError:
+            text = ""
+        for device, mountpoint, _fstype in parse_mountinfo(text):
+            self.by_device.setdefault(device, []).append(mountpoint)
+        self.walked: dict[int, str] = {}
+        self.usages: dict[int, tuple] = {}
+
+    def device(self, path) -> int:
+        return os.stat(path).st_dev
+
+    def mountpoint(self, path, device: int | None = None) -> str:
+        path = os.path.abspath(path)
+        if device is None:
+            device = self.device(path)
+
+        mountpoints = self.by_device.get(device)
+        if mountpoints:
+            # bind mounts list one device several times: the deepest mountpoint containing path wins
+            best = None
+            for mountpoint in mountpoints:
+                if is_within(path, mountpoint) and (best is None or len(mountpoint) > len(best)):
+                    best = mountpoint
+            if best is not None:
+                return best
+            if len(mountpoints) == 1:
+                return mountpoints[0]  # path goes through a symlink
+
+        if device not in self.walked:
+            mountpoint = Path(path).resolve()
+            while mountpoint.parent != mountpoint:
+                try:
+                    if os.stat(mountpoint.parent).st_dev != device:
+                        break
+                except OSError:
+                    break
+                mountpoint = mountpoint.parent
+            self.walked[device] = str(mountpoint)
+        return self.walked[device]
+
+    def usage(self, path, device: int | None = None):
+        if device is None:
+            device = self.device(path)
+        if device not in self.usages:
+            self.usages[device] = shutil.disk_usage(path)
+        return self.usages[device]
+
+    def refresh(self):
+        """Forget the disk usage measured so far; mountpoints are kept"""
+        self.usages.clear()
@@ -0,0 +1,68 @@
+from pathlib import Path
+
+FOLDER = ""  # trie key for a folder root; path parts are never empty
+
+
+class FolderResolver:
+    """Maps local paths to Syncthing folders through a trie of resolved folder roots
+
+    Built once from config/folders; lookups walk the trie one path component at a time instead of
+    resolving every folder root for every path.
+    """
+
+    def __init__(self, folders: list[dict]):
+        self.folders = {d["id"]: d for d in folders}
+        self.trie: dict = {}
+        for folder in folders:
+            if not folder.get("path"):
+                continue
+            node = self.trie
+            for part in Path(folder["path"]).expanduser().resolve().parts:
+                node = node.setdefault(part, {})
+            node.setdefault(FOLDER, []).append(folder)
+
+    def folder(self, folder_id: str) -> dict | None:
+        return self.folders.get(folder_id)
+
+    def containing(self, abs_path) -> list[tuple[dict, str | None]]:
+        """Folders whose roots contain abs_path, innermost first, each with abs_path relative to its root or None"""
+        parts = Path(abs_path).parts
+        node = self.trie
+        found = []
+        for depth, part in enumerate(parts):
+            node = node.get(part)
+            if node is None:
+                break
+            if FOLDER in node:
+                prefix = "/".join(parts[depth + 1 :]) or None
+                found = [(folder, prefix) for folder in node[FOLDER]] + found
+        return found
+
+    def resolve(self, abs_path) -> tuple[str | None, str | None]:
+        """Returns (folder_id, relative path or None for the folder root) of the deepest folder containing abs_path"""
+        found = self.containing(abs_path)
+        if not found:
+            return None, None
+        folder, prefix = found[0]
+        return folder["id"], prefix
+
+    def below(self, abs_path) -> list[tuple[dict, str]]:
+        """Folders whose roots are strictly inside abs_path, with their root relative to abs_path"""
+        node = self.trie
+        for part in Path(abs_path).parts:
+            node = node.get(part)
+            if node is None:
+                return []
+
+        found = []
+        stack = [(node, ())]
+        while stack:
+            node, rel_parts = stack.pop()
+            if rel_parts and FOLDER in node:
+                found.extend((folder, "/".join(rel_parts)) for folder in node[FOLDER])
+            for part, child in node.items():
+                if part != FOLDER:
+                    stack.append((child, rel_parts + (part,)))
+
+        order = {folder_id: i for i, folder_id in enumerate(self.folders)}
+        return sorted(found, key=lambda t: order[t[0]["id"]])
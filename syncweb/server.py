@@ -0,0 +1,322 @@
+import io, json, logging, os, signal, socket, sys, threading
+from contextlib import contextmanager, suppress
+from pathlib import Path
+
+from syncweb import log_utils
+from syncweb.log_utils import log
+
+SOCKET_NAME = "syncweb.sock"
+LOCAL_ONLY_COMMANDS = {"server", "serve", "repl", "automatic", "help"}
+# options which keep a command running for hours: run them in the client so that they stop with it
+LOCAL_ONLY_OPTIONS = {"download": {"--schedule", "--prioritize"}}
+
+
+def is_local_only(command: str, command_argv: list[str]) -> bool:
+    if command in LOCAL_ONLY_COMMANDS:
+        return True
+    options = LOCAL_ONLY_OPTIONS.get(command, ())
+    return any(arg.partition("=")[0] in options for arg in command_argv)
+
+
+def socket_path(home) -> Path:
+    return Path(home) / SOCKET_NAME
+
+
+def send(f, **message):
+    f.write(json.dumps(message).encode() + b"\n")
+    f.flush()
+
+
+def receive(f):
+    line = f.readline()
+    if not line:
+        raise ConnectionError("Syncweb server closed the connection")
+    return json.loads(line)
+
+
+class SocketOutput(io.TextIOBase):
+    def __init__(self, f, stream="stdout", tty=False):
+        self.f = f
+        self.stream = stream
+        self.tty = tty
+        self.buffer_ = []
+        self.buffered = 0
+
+    def writable(self):
+        return True
+
+    def isatty(self):
+        return self.tty
+
+    def write(self, s):
+        self.buffer_.append(s)
+        self.buffered += len(s)
+        if self.buffered > 65536:
+            self.flush()
+        return len(s)
+
+    def flush(self):
+        if self.buffer_:
+            send(self.f, **{self.stream: "".join(self.buffer_)})
+            self.buffer_ = []
+            self.buffered = 0
+
+
+class RemoteStdin(io.TextIOBase):
+    """Reads from the client's stdin on demand so commands which never touch stdin do not consume it"""
+
+    def __init__(self, f, stdout: SocketOutput, tty=False):
+        self.f = f
+        self.stdout = stdout
+        self.tty = tty
+
+    def readable(self):
+        return True
+
+    def isatty(self):
+        return self.tty
+
+    def _request(self, mode):
+        self.stdout.flush()
+        send(self.f, stdin=mode)
+        return receive(self.f).get("data", "")
+
+    def read(self, size=-1):
+        return self._request("read")
+
+    def readline(self, size=-1):
+        return self._request("readline")
+
+    def readlines(self, hint=-1):
+        return self.read().splitlines(keepends=True)
+
+
+def forward(home, argv) -> int | None:
+    """Run a command on a resident Syncweb server; returns None if no server is listening"""
+    path = socket_path(home)
+    if not path.exists():
+        return None
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(str(path))
+    except OSError:
+        sock.close()
+        return None
+
+    with sock, sock.makefile("rwb") as f:
+        send(f, argv=argv, cwd=os.getcwd(), is_terminal=log_utils.is_terminal)
+        while True:
+            message = receive(f)
+            if "stdout" in message:
+                try:
+                    sys.stdout.write(message["stdout"])
+                    sys.stdout.flush()
+                except BrokenPipeError:
+                    sys.stdout = None
+                    return 141
+            elif "stderr" in message:
+                sys.stderr.write(message["stderr"])
+                sys.stderr.flush()
+            elif "stdin" in message:
+                data = sys.stdin.readline() if message["stdin"] == "readline" else sys.stdin.read()
+                send(f, data=data)
+            elif "exit" in message:
+                return message["exit"]
+
+
+def exit_code(e: SystemExit) -> int:
+    if e.code is None:
+        return 0
+    if isinstance(e.code, int):
+        return e.code
+    print(e.code, file=sys.stderr)
+    return 1
+
+
+class ThreadStream:
+    """Stands in for sys.stdin/stdout/stderr so that each thread handling a request uses its client's streams"""
+
+    def __init__(self, name, default):
+        self.name = name
+        self.default = default
+
+    def __getattr__(self, attr):
+        return getattr(log_utils.client.__dict__.get(self.name) or self.default, attr)
+
+
+class ClientLogHandler(logging.Handler):
+    """Sends log records to the client of the current thread, at the verbosity it asked for"""
+
+    def emit(self, record):
+        stderr = getattr(log_utils.client, "stderr", None)
+        if stderr is not None and record.levelno >= log_utils.client.log_level:
+            stderr.write(self.format(record) + "\n")
+
+
+def server_only(level):
+    def accept(record):
+        return getattr(log_utils.client, "stderr", None) is None and record.levelno >= level
+
+    return accept
+
+
+@contextmanager
+def client_streams():
+    """Route stdio and logging by thread; a no-op if already installed"""
+    if isinstance(sys.stdout, ThreadStream):
+        yield
+        return
+
+    stdio = sys.stdin, sys.stdout, sys.stderr
+    sys.stdin, sys.stdout, sys.stderr = (ThreadStream(name, s) for name, s in zip(("stdin", "stdout", "stderr"), stdio))
+
+    # each client chooses its own verbosity, so the syncweb logger lets everything through to the handlers
+    level = log.level
+    log.setLevel(logging.DEBUG)
+    handlers = [h for h in logging.root.handlers + log.handlers if isinstance(h, logging.StreamHandler)]
+    accept = server_only(level)
+    for h in handlers:
+        h.addFilter(accept)
+    client_handler = ClientLogHandler()
+    client_handler.setFormatter(logging.Formatter("%(message)s"))
+    logging.root.addHandler(client_handler)
+    try:
+        yield
+    finally:
+        logging.root.removeHandler(client_handler)
+        for h in handlers:
+            h.removeFilter(accept)
+        log.setLevel(level)
+        sys.stdin, sys.stdout, sys.stderr = stdio
+
+
+class WorkingDirectory:
+    """The working directory is shared by all threads: requests from one directory run concurrently,
+    requests from another directory wait until those finished"""
+
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.cwd = None
+        self.users = 0
+
+    @contextmanager
+    def use(self, cwd):
+        with self.cond:
+            self.cond.wait_for(lambda: self.users == 0 or self.cwd == cwd)
+            if self.users == 0:
+                self.previous = os.getcwd()
+                os.chdir(cwd)
+                self.cwd = cwd
+            self.users += 1
+        try:
+            yield
+        finally:
+            with self.cond:
+                self.users -= 1
+                if self.users == 0:
+                    os.chdir(self.previous)
+                    self.cwd = None
+                self.cond.notify_all()
+
+
+working_directory = WorkingDirectory()
+
+
+def handle(conn, st, create_parser, shutdown: threading.Event):
+    with conn, conn.makefile("rwb") as f, client_streams():
+        request = receive(f)
+        is_terminal = request.get("is_terminal", False)
+        stdout = SocketOutput(f, "stdout", is_terminal)
+        stderr = SocketOutput(f, "stderr", is_terminal)
+
+        code = 0
+        log.info("[server] %s", request["argv"])
+        try:
+            subparsers = create_parser()
+            # the client's global options, e.g. -v, apply to this request only
+            global_args, _rest = subparsers.parser.parse_known_args(request["argv"])
+            verbose = getattr(global_args, "verbose", 0) or 0
+            log_utils.client.__dict__.update(
+                stdin=RemoteStdin(f, stdout, is_terminal),
+                stdout=stdout,
+                stderr=stderr,
+                is_terminal=is_terminal,
+                log_level=log_utils.clamp_index(log_utils.LOG_LEVELS, verbose),
+            )
+            with working_directory.use(request["cwd"]):
+                args = subparsers.parse(request["argv"])
+                args.st = st
+                args.run()
+            if args.command == "shutdown":
+                shutdown.set()
+        except SystemExit as e:
+            code = exit_code(e)
+        except Exception as e:
+            log.exception("[server] %s failed", request["argv"])
+            print(f"error: {e}", file=sys.stderr)
+            code = 1
+        finally:
+            log_utils.client.__dict__.clear()
+            with suppress(OSError):
+                stdout.flush()
+                stderr.flush()
+                send(f, exit=code)
+
+
+def is_listening(path) -> bool:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+        try:
+            s.connect(str(path))
+            return True
+        except OSError:
+            return False
+
+
+def serve(args, create_parser):
+    path = socket_path(args.st.home)
+    if path.exists():
+        if is_listening(path):
+            log.error("A Syncweb server is already listening on %s", path)
+            raise SystemExit(1)
+        path.unlink()
+
+    shutdown = threading.Event()
+
+    def handle_signal(signum, frame):
+        log.info("[server] received signal %s, shutting down", signum)
+        shutdown.set()
+
+    signal.signal(signal.SIGTERM, handle_signal)
+    signal.signal(signal.SIGINT, handle_signal)
+
+    # keep the file index current while idle so commands never have to re-browse
+    args.st.event_watcher.catch_up()
+    args.st.event_watcher.start(shutdown)
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.bind(str(path))
+    os.chmod(path, 0o600)
+    sock.listen(16)
+    sock.settimeout(1)
+    log.warning("Syncweb server listening on %s", path)
+
+    def serve_connection(conn):
+        try:
+            handle(conn, args.st, create_parser, shutdown)
+        except Exception as e:
+            log.warning("[server] connection error: %s", e)
+
+    try:
+        with client_streams():
+            while not shutdown.is_set():
+                try:
+                    conn, _ = sock.accept()
+                except TimeoutError:
+                    continue
+                conn.settimeout(None)
+                threading.Thread(target=serve_connection, args=(conn,), name="syncweb-client", daemon=True).start()
+    finally:
+        sock.close()
+        with suppress(FileNotFoundError):
+            path.unlink()
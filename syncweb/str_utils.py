@@ -1,13 +1,11 @@
 import datetime, os, re, sys
 from contextlib import suppress
+from functools import cache
 from datetime import timezone as tz
 from pathlib import Path
 from typing import Iterable, Iterator
 from urllib.parse import parse_qsl, quote, unquote, urlparse, urlunparse
 
-import humanize
-from idna import decode as puny_decode
-
 from syncweb import consts
 from syncweb.consts import FolderRef
 from syncweb.log_utils import log
@@ -153,6 +151,8 @@ def parse_syncweb_path(value: str, decode: bool = True) -> FolderRef:
         subpath = parts[1] if len(parts) > 1 else None
 
         if decode:
+            from idna import decode as puny_decode
+
             folder_id = selective_unquote(folder_id, "")
             with suppress(Exception):
                 folder_id = puny_decode(folder_id)
@@ -203,8 +203,16 @@ def basename(path):
     return os.path.basename(path.rstrip(sep))
 
 
+@cache
+def naturalsize():
+    # humanize is slow to import; load it on the first formatted size rather than per row or at startup
+    import humanize
+
+    return humanize.naturalsize
+
+
 def file_size(n):
-    return humanize.naturalsize(n, binary=True).replace(" ", "")
+    return naturalsize()(n, binary=True).replace(" ", "")
 
 
 def safe_int(s) -> int | None:
@@ -363,35 +371,39 @@ def human_to_bytes(input_str, binary=True) -> int:
     return int(float(value) * unit_multiplier)
 
 
-def human_to_lambda_part(var, human_to_x, size):
-    if var is None:
-        var = 0
-
-    if size.startswith(">"):
-        return var > human_to_x(size.lstrip(">"))
+def compile_human_part(human_to_x, size):
+    # parse the human-readable bound once; the returned check is called per item
+    if size.startswith((">", "+")):
+        bound = human_to_x(size.lstrip(size[0]))
+        return lambda var: (var or 0) > bound
     elif size.startswith("<"):
-        return var < human_to_x(size.lstrip("<"))
-    elif size.startswith("+"):
-        return var > human_to_x(size.lstrip("+"))
+        bound = human_to_x(size.lstrip("<"))
+        return lambda var: (var or 0) < bound
     elif size.startswith("-"):
-        return human_to_x(size.lstrip("-")) >= var
+        bound = human_to_x(size.lstrip("-"))
+        return lambda var: bound >= (var or 0)
     elif "%" in size:
         size, percent = size.split("%")
         size = human_to_x(size)
         percent = float(percent)
         lower_bound = int(size - (size * (percent / 100)))
         upper_bound = int(size + (size * (percent / 100)))
-        return lower_bound <= var and var <= upper_bound
+        return lambda var: lower_bound <= (var or 0) <= upper_bound
     else:
-        return var == human_to_x(size)
+        bound = human_to_x(size)
+        return lambda var: (var or 0) == bound
 
 
 def parse_human_to_lambda(human_to_x, sizes):
     if not sizes:
         return lambda _var: True
 
+    checks = [compile_human_part(human_to_x, size) for size in sizes]
+    if len(checks) == 1:
+        return checks[0]
+
     def check_all_sizes(var):
-        return all(human_to_lambda_part(var, human_to_x, size) for size in sizes)
+        return all(check(var) for check in checks)
 
     return check_all_sizes
 
@@ -1,14 +1,17 @@
 import ipaddress, os, shutil, socket, subprocess, tempfile, time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from functools import cached_property
 from pathlib import Path
 
 import requests
+from requests.adapters import HTTPAdapter
 
 from syncweb.cmd_utils import Pclose, cmd
 from syncweb.config import ConfigXML
 from syncweb.consts import PYTEST_RUNNING
 from syncweb.ensure import ensure_syncthing
-from syncweb.log_utils import log
+from syncweb.log_utils import client, log
 
 ROLE_TO_TYPE = {
     "r": "receiveonly",
@@ -17,12 +20,13 @@ ROLE_TO_TYPE = {
 }
 
 ULA_NETWORK = ipaddress.IPv6Network("fc00::/7")
+MAX_WORKERS = 8
+BROWSE_MIN_PATHS = 4  # fewer paths than this in one directory: cheaper to ask db/file for each
 
 
 class SyncthingNodeXML:
     def __init__(self, name: str = "st-node", syncthing_exe=None, base_dir=None):
         self.name = name
-        self.syncthing_exe = syncthing_exe or ensure_syncthing()
         self.process: subprocess.Popen
         self.sync_port: int
         self.discovery_port: int
@@ -32,6 +36,7 @@ class SyncthingNodeXML:
             log.info("Using home %s", base_dir)
         self.home = Path(base_dir)
         self.home.mkdir(parents=True, exist_ok=True)
+        self.syncthing_exe = syncthing_exe or ensure_syncthing(cache_dir=self.home)
         self.config_path = self.home / "config.xml"
 
         if not self.config_path.exists():
@@ -353,10 +358,63 @@ class SyncthingNodeXML:
     def session(self):
         s = requests.Session()
         s.headers.update({"X-API-Key": self.api_key})
+        # allow one pooled connection per gather() worker
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=MAX_WORKERS)
+        s.mount("http://", adapter)
+        s.mount("https://", adapter)
         return s
 
+    def invalidate_folders(self):
+        # the cached folder config (folder_resolver) is stale after any config write or ConfigSaved event
+        self.__dict__.pop("folder_resolver", None)
+
+    def gather(self, fn, items, ordered=True, max_workers=MAX_WORKERS):
+        """Call fn(item) concurrently for each item, yielding (item, result) pairs
+
+        At most max_workers * 2 calls are in flight so items can be a lazy iterable of any length.
+        Results are yielded in input order, or as they complete when ordered=False.
+        """
+        items = iter(items)
+        # workers write to the same Syncweb server client as the calling thread
+        pool = ThreadPoolExecutor(
+            max_workers,
+            thread_name_prefix="syncweb-gather",
+            initializer=client.__dict__.update,
+            initargs=(dict(client.__dict__),),
+        )
+        in_flight = deque()
+
+        def submit_next():
+            for item in items:
+                in_flight.append((item, pool.submit(fn, item)))
+                return True
+            return False
+
+        try:
+            for _ in range(max_workers * 2):
+                if not submit_next():
+                    break
+
+            if ordered:
+                while in_flight:
+                    item, future = in_flight.popleft()
+                    result = future.result()
+                    submit_next()
+                    yield item, result
+            else:
+                while in_flight:
+                    done, _ = wait([f for _, f in in_flight], return_when=FIRST_COMPLETED)
+                    for item, future in [t for t in in_flight if t[1] in done]:
+                        in_flight.remove((item, future))
+                        submit_next()
+                        yield item, future.result()
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+
     def _put(self, path, **kwargs):
         resp = self.session.put(f"{self.api_url}/rest/{path}", **kwargs)
+        if path.startswith("config"):
+            self.invalidate_folders()
         if resp.text:
             log.debug(resp.text)
         if resp.status_code == 404:
@@ -368,6 +426,8 @@ class SyncthingNodeXML:
 
     def _post(self, path, json=None, **kwargs):
         resp = self.session.post(f"{self.api_url}/rest/{path}", json=json, **kwargs)
+        if path.startswith("config"):
+            self.invalidate_folders()
         if resp.text:
             log.debug(resp.text)
         if resp.status_code == 404:
@@ -379,6 +439,8 @@ class SyncthingNodeXML:
 
     def _patch(self, path, **kwargs):
         resp = self.session.patch(f"{self.api_url}/rest/{path}", **kwargs)
+        if path.startswith("config"):
+            self.invalidate_folders()
         if resp.text:
             log.debug(resp.text)
         if resp.status_code == 404:
@@ -390,6 +452,8 @@ class SyncthingNodeXML:
 
     def _delete(self, path, **kwargs):
         resp = self.session.delete(f"{self.api_url}/rest/{path}", **kwargs)
+        if path.startswith("config"):
+            self.invalidate_folders()
         if resp.text:
             log.debug(resp.text)
         if resp.status_code == 404:
@@ -442,6 +506,14 @@ class SyncthingNode(SyncthingNodeXML):
                 time.sleep(delay)
         raise RuntimeError("Failed to get status of Syncthing node")
 
+    def events(self, since: int = 0, limit: int | None = None, timeout: int = 60, event_types=None):
+        params = {"since": str(since), "timeout": str(timeout)}
+        if limit is not None:
+            params["limit"] = str(limit)
+        if event_types:
+            params["events"] = ",".join(event_types)
+        return self._get("events", params=params, timeout=timeout + 30) or []
+
     def system_errors(self):
         return self._get("system/error")
 
@@ -497,11 +569,17 @@ class SyncthingNode(SyncthingNodeXML):
 
     @property
     def folders_dict(self):
-        return {d["id"]: d for d in self.folders()}
+        return dict(self.folder_resolver.folders)
 
     @property
     def folder_roots(self):
-        return {d["path"]: d["id"] for d in self.folders()}
+        return {d["path"]: d["id"] for d in self.folder_resolver.folders.values()}
+
+    @cached_property
+    def folder_resolver(self):
+        from syncweb.resolver import FolderResolver
+
+        return FolderResolver(self.folders() or [])
 
     def add_device(self, **kwargs):
         return self._post("config/devices", json=kwargs)
@@ -711,6 +789,23 @@ class SyncthingNode(SyncthingNodeXML):
 
         return self._get("db/browse", params=params)
 
+    def files_iter(self, folder_id: str, levels: int | None = None, prefix: str | None = None):
+        """Stream db/browse as (path, parent, depth, item) tuples without buffering the whole response"""
+        from syncweb.json_stream import iter_browse
+
+        params = {"folder": folder_id}
+        if levels is not None:
+            params["levels"] = str(levels)
+        if prefix is not None:
+            params["prefix"] = prefix
+
+        with self.session.get(f"{self.api_url}/rest/db/browse", params=params, stream=True) as resp:
+            if resp.status_code == 404:
+                log.info("404 Not Found db/browse %s", params)
+                return
+            resp.raise_for_status()
+            yield from iter_browse(resp.iter_content(chunk_size=65536))
+
     def file(self, folder_id: str, relative_path: str):
         params = {"folder": folder_id, "file": relative_path}
 
@@ -722,6 +817,48 @@ class SyncthingNode(SyncthingNodeXML):
             resp.raise_for_status()
         return resp.json()
 
+    def files_detail(self, folder_id: str, paths) -> dict:
+        """db/file for many paths at once (local, global, availability); missing paths map to None"""
+        return dict(self.gather(lambda path: self.file(folder_id, path), paths))
+
+    def files_meta(self, folder_id: str, paths) -> dict:
+        """Browse-shaped metadata (name, type, size, modTime) for many paths at once; missing paths map to None
+
+        Paths are grouped by parent directory and answered with one db/browse per directory, falling back
+        to concurrent db/file calls for small groups and for anything the listing did not contain.
+        """
+        groups = {}
+        for path in paths:
+            parent, _, name = path.strip("/").rpartition("/")
+            groups.setdefault(parent, {})[name] = path
+
+        def browse(parent):
+            return self.files(folder_id, levels=0, prefix=parent or None) or []
+
+        meta = {}
+        listed = [parent for parent, names in groups.items() if len(names) >= BROWSE_MIN_PATHS]
+        for parent, items in self.gather(browse, listed, ordered=False):
+            names = groups[parent]
+            for item in items:
+                path = names.get(item.get("name"))
+                if path is not None:
+                    item.pop("children", None)
+                    meta[path] = item
+
+        remaining = [path for names in groups.values() for path in names.values() if path not in meta]
+        for path, file_data in self.gather(lambda path: self.file(folder_id, path), remaining):
+            entry = (file_data or {}).get("global")
+            if not entry or entry.get("deleted"):
+                meta[path] = None
+                continue
+            meta[path] = {
+                "name": entry.get("name", path).rpartition("/")[2],
+                "type": entry.get("type", ""),
+                "size": entry.get("size", 0),
+                "modTime": entry.get("modified", ""),
+            }
+        return meta
+
     def folder_revert(self, receiveonly_folder_id: str):
         return self._post("db/revert", json={"folder": receiveonly_folder_id})
 
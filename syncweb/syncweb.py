@@ -1,11 +1,70 @@
 import os
+from contextlib import contextmanager
+from functools import cached_property
 
 from syncweb import str_utils
+from syncweb.events import EventWatcher
+from syncweb.ignores import IgnoreState
+from syncweb.index import FileIndex, normalize_prefix
 from syncweb.log_utils import log
 from syncweb.syncthing import SyncthingNode
+from syncweb.tree import CompactTree
 
 
 class Syncweb(SyncthingNode):
+    batching_ignores = 0
+
+    @cached_property
+    def index(self):
+        return FileIndex(self.home / "index.db")
+
+    @cached_property
+    def event_watcher(self):
+        watcher = EventWatcher(self, self.index)
+        watcher.listeners.append(self.on_events)
+        return watcher
+
+    def on_events(self, events):
+        if any(event["type"] == "ConfigSaved" for event in events):
+            self.invalidate_folders()
+
+    def catch_up_events(self):
+        try:
+            self.event_watcher.catch_up()
+        except Exception as e:
+            log.debug("Could not catch up on events: %s", e)
+            self.index.tracking = False
+
+    def refresh_index(self, folder_id: str):
+        self.catch_up_events()
+        self.index.refresh(self, folder_id)
+
+    def indexed_files(self, folder_id: str, levels: int | None = None, prefix: str | None = None):
+        self.refresh_index(folder_id)
+        return self.index.files(folder_id, prefix=prefix, levels=levels)
+
+    def indexed_entries(self, folder_id: str, levels: int | None = None, prefix: str | None = None):
+        """Stream (path, parent, depth, item) below prefix; a stale index is rebuilt first, so that a slow
+        consumer only holds a read cursor and never blocks the EventWatcher"""
+        self.refresh_index(folder_id)
+        yield from self.index.entries(folder_id, prefix=prefix, levels=levels)
+
+    def indexed_tree(self, folder_id: str, levels: int | None = None, prefix: str | None = None) -> CompactTree:
+        # the index has every row down to the requested levels, so directories above them without rows are empty
+        prefix = normalize_prefix(prefix)
+        listed_depth = float("inf") if levels is None else levels + (prefix.count("/") + 1 if prefix else 0)
+        entries = self.indexed_entries(folder_id, levels=levels, prefix=prefix)
+        return CompactTree.from_entries(entries, listed_depth)
+
+    def indexed_file(self, folder_id: str, relative_path: str):
+        self.refresh_index(folder_id)
+        return self.index.file(folder_id, relative_path)
+
+    def indexed_files_meta(self, folder_id: str, paths) -> dict:
+        """SyncthingNode.files_meta answered from the file index, plus num_peers (None when not cached)"""
+        self.refresh_index(folder_id)
+        return self.index.files_meta(folder_id, paths)
+
     def cmd_accept(self, device_ids, folder_ids, introducer=False):
         device_count = 0
         for path in device_ids:
@@ -78,9 +137,8 @@ class Syncweb(SyncthingNode):
             os.makedirs(path, exist_ok=True)
             path = os.path.realpath(path)
 
-            if path in self.folder_roots:
-                folder_id = self.folder_roots[path]
-            else:
+            folder_id = self.folder_roots.get(path)
+            if folder_id is None:
                 folder_id = self.create_folder_id(path)
                 self.add_folder(id=folder_id, label=str_utils.basename(path), path=path, type="sendonly")
                 self.set_ignores(folder_id, lines=[])
@@ -102,9 +160,8 @@ class Syncweb(SyncthingNode):
                 path = os.path.join(default_path, ref.folder_id)
                 os.makedirs(path, exist_ok=True)
 
-                if path in self.folder_roots:
-                    folder_id = self.folder_roots[path]
-                else:
+                folder_id = self.folder_roots.get(path)
+                if folder_id is None:
                     folder_id = self.create_folder_id(path)
                     self.add_folder(
                         id=folder_id, label=str_utils.basename(path), path=path, type="receiveonly", paused=True
@@ -123,26 +180,46 @@ class Syncweb(SyncthingNode):
 
         return device_count, folder_count
 
+    def child_names(self, folder_id: str, directory: str) -> set[str]:
+        return {d["name"] for d in self.indexed_files(folder_id, levels=0, prefix=directory)}
+
+    @cached_property
+    def ignore_states(self) -> dict[str, IgnoreState]:
+        return {}
+
+    @cached_property
+    def pending_ignores(self) -> dict[str, set[str]]:
+        return {}
+
+    def ignore_state(self, folder_id: str) -> IgnoreState:
+        server_lines = self.ignores(folder_id).get("ignore") or []
+        state = self.ignore_states.get(folder_id)
+        if state is None or state.server_lines != server_lines:  # first use or edited elsewhere
+            state = self.ignore_states[folder_id] = IgnoreState(folder_id, server_lines)
+        return state
+
     def add_ignores(self, folder_id: str, unignores: list[str]):
-        existing = set(s for s in self.ignores(folder_id)["ignore"] if not s.startswith("// Syncweb-managed"))
-
-        new = set()
-        for p in unignores:
-            if p.startswith("//"):
-                continue
-            if not p.startswith("!/"):
-                p = "!/" + p
-            new.add(p)
-
-        combined = new.union(existing)
-        ordered = (
-            ["// Syncweb-managed"]
-            + sorted([p for p in combined if p.startswith("!")])
-            + sorted([p for p in combined if not p.startswith("!") and p != "*"])
-            + ["*"]
-        )
-
-        self.set_ignores(folder_id, lines=ordered)
+        self.pending_ignores.setdefault(folder_id, set()).update(unignores)
+        if not self.batching_ignores:
+            self.flush_ignores()
+
+    def flush_ignores(self):
+        while self.pending_ignores:
+            folder_id, unignores = self.pending_ignores.popitem()
+            state = self.ignore_state(folder_id)
+            state.add(unignores)
+            state.flush(self, lambda d: self.child_names(folder_id, d))
+
+    @contextmanager
+    def batch_ignores(self):
+        """Collect add_ignores() calls and write each folder's ignores once at the end"""
+        self.batching_ignores += 1
+        try:
+            yield
+        finally:
+            self.batching_ignores -= 1
+            if not self.batching_ignores:
+                self.flush_ignores()
 
     def device_short2long(self, short):
         matches = [d for d in self.devices_list if d.startswith(short)]
@@ -0,0 +1,223 @@
+import datetime
+from array import array
+from collections.abc import Mapping
+
+from syncweb.index import walk_browse
+from syncweb.str_utils import isodate2seconds
+
+DIRECTORY = "FILE_INFO_TYPE_DIRECTORY"
+NO_TIME = -(2**63)
+ANNOTATIONS = {"total_size": "total_sizes", "file_count": "file_counts", "max_depth": "max_depths"}
+
+
+def seconds2iso(seconds: int) -> str:
+    if seconds == NO_TIME:
+        return ""
+    return datetime.datetime.fromtimestamp(seconds, datetime.timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class CompactTree:
+    """db/browse tree stored in parallel arrays instead of one dict per entry
+
+    Names are packed into one UTF-8 buffer, types are stored as small codes and sizes, mtimes and links
+    between nodes live in typed arrays: roughly 50 bytes plus the name per entry. Node views behave like
+    the browse dicts so ls, find and download helpers work on either.
+    """
+
+    def __init__(self):
+        self.name_data = bytearray()
+        self.name_offsets = array("Q", [0])
+        self.type_names: list[str] = []
+        self.type_codes: dict[str, int] = {}
+        self.types = array("B")
+        self.sizes = array("q")
+        self.mtimes = array("q")
+        self.parents = array("i")
+        self.first_child = array("i")
+        self.next_sibling = array("i")
+        self.listed = bytearray()  # 1 for directories whose children are all present, possibly none
+        self.roots: list[int] = []
+        self.total_sizes: array | None = None
+        self.file_counts: array | None = None
+        self.max_depths: array | None = None
+
+    def __len__(self):
+        return len(self.types)
+
+    @classmethod
+    def from_items(cls, items):
+        return cls.from_entries(walk_browse(items or []))
+
+    @classmethod
+    def from_entries(cls, entries, listed_depth: float = -1):
+        """Build from (path, parent, depth, item) entries where parents come before their children
+
+        Directories with a "children" key, or above listed_depth, are known to be complete: when they have
+        no entries they are empty rather than cut off by the browse levels.
+        """
+        tree = cls()
+        dirs = {}  # path -> index, only needed while building
+        last_child = {}
+        last_root = -1
+
+        # bound methods hoisted out of the loop; this runs once per entry of possibly millions
+        name_data, name_offsets_append = tree.name_data, tree.name_offsets.append
+        types_append, sizes_append, mtimes_append = tree.types.append, tree.sizes.append, tree.mtimes.append
+        parents_append, first_child, next_sibling = tree.parents.append, tree.first_child, tree.next_sibling
+        listed_append, type_codes = tree.listed.append, tree.type_codes
+
+        for i, (path, parent, depth, item) in enumerate(entries):
+            type_ = item.get("type", "")
+            code = type_codes.get(type_)
+            if code is None:
+                code = type_codes[type_] = len(tree.type_names)
+                tree.type_names.append(type_)
+            name_data += item.get("name", "").encode()
+            name_offsets_append(len(name_data))
+            types_append(code)
+            sizes_append(item.get("size", 0))
+            mod_time = item.get("modTime")
+            mtimes_append(isodate2seconds(mod_time) if mod_time else NO_TIME)
+            first_child.append(-1)
+            next_sibling.append(-1)
+            listed_append(type_ == DIRECTORY and ("children" in item or depth < listed_depth))
+
+            parent_index = dirs.get(parent, -1) if parent else -1
+            parents_append(parent_index)
+            if parent_index == -1:
+                tree.roots.append(i)
+                if last_root != -1:
+                    next_sibling[last_root] = i
+                last_root = i
+            else:
+                previous = last_child.get(parent_index, -1)
+                if previous == -1:
+                    first_child[parent_index] = i
+                else:
+                    next_sibling[previous] = i
+                last_child[parent_index] = i
+
+            if type_ == DIRECTORY:
+                dirs[path] = i
+        return tree
+
+    def name(self, i: int) -> str:
+        return self.name_data[self.name_offsets[i] : self.name_offsets[i + 1]].decode()
+
+    def type(self, i: int) -> str:
+        return self.type_names[self.types[i]]
+
+    def is_dir(self, i: int) -> bool:
+        return self.type_names[self.types[i]] == DIRECTORY
+
+    def has_children(self, i: int) -> bool:
+        """Whether the browse dict of this entry would have a "children" key"""
+        return self.first_child[i] != -1 or self.listed[i] == 1
+
+    def children(self, i: int):
+        c = self.first_child[i]
+        while c != -1:
+            yield c
+            c = self.next_sibling[c]
+
+    def path(self, i: int) -> str:
+        parts = []
+        while i != -1:
+            parts.append(self.name(i))
+            i = self.parents[i]
+        return "/".join(reversed(parts))
+
+    def annotate(self):
+        """Compute total_size, file_count and max_depth for every node in one reverse pass"""
+        n = len(self)
+        totals = array("q", bytes(8 * n))
+        counts = array("q", bytes(8 * n))
+        depths = array("i", bytes(4 * n))
+        dir_code = self.type_codes.get(DIRECTORY, -1)
+        # children are always appended after their parent so a reverse scan is bottom-up
+        for i in range(n - 1, -1, -1):
+            if self.types[i] != dir_code:
+                totals[i] = self.sizes[i]
+                counts[i] = 1
+            elif self.first_child[i] == -1 and not self.listed[i]:
+                totals[i] = self.sizes[i]  # children not listed: beyond the browse levels
+            parent = self.parents[i]
+            if parent != -1:
+                totals[parent] += totals[i]
+                counts[parent] += counts[i]
+                if self.types[parent] == dir_code and depths[parent] < depths[i] + 1:
+                    depths[parent] = depths[i] + 1
+        self.total_sizes, self.file_counts, self.max_depths = totals, counts, depths
+
+    def node(self, i: int) -> "Node":
+        return Node(self, i)
+
+    def top(self) -> list["Node"]:
+        return [Node(self, i) for i in self.roots]
+
+    def nodes(self):
+        return (Node(self, i) for i in range(len(self)))
+
+    def files(self):
+        dir_code = self.type_codes.get(DIRECTORY, -1)
+        return (Node(self, i) for i in range(len(self)) if self.types[i] != dir_code)
+
+
+class Node(Mapping):
+    """Read-only dict view of one CompactTree entry, with the keys ls.annotate() would add"""
+
+    __slots__ = ("tree", "i")
+    KEYS = ("name", "type", "size", "modTime", "modified", "path", "total_size", "file_count", "max_depth")
+
+    def __init__(self, tree: CompactTree, i: int):
+        self.tree = tree
+        self.i = i
+
+    def __getitem__(self, key):
+        tree, i = self.tree, self.i
+        match key:
+            case "name":
+                return tree.name(i)
+            case "type":
+                return tree.type(i)
+            case "size":
+                return tree.sizes[i]
+            case "modTime":
+                return seconds2iso(tree.mtimes[i])
+            case "modified":
+                return None if tree.mtimes[i] == NO_TIME else tree.mtimes[i]
+            case "path":
+                return tree.path(i)
+            case "children":
+                if not tree.has_children(i):
+                    raise KeyError(key)
+                return [Node(tree, c) for c in tree.children(i)]
+            case "total_size" | "file_count" | "max_depth":
+                if tree.total_sizes is None:
+                    tree.annotate()
+                return getattr(tree, ANNOTATIONS[key])[i]
+        raise KeyError(key)
+
+    def __contains__(self, key):
+        if key == "children":
+            return self.tree.has_children(self.i)
+        return key in self.KEYS
+
+    def __iter__(self):
+        yield from self.KEYS
+        if self.tree.has_children(self.i):
+            yield "children"
+
+    def __len__(self):
+        return len(self.KEYS) + self.tree.has_children(self.i)
+
+    def __eq__(self, other):
+        if isinstance(other, Node):
+            return self.tree is other.tree and self.i == other.i
+        return super().__eq__(other)
+
+    def __hash__(self):
+        return hash((id(self.tree), self.i))
+
+    def __repr__(self):
+        return f"Node({self.tree.path(self.i)!r})"
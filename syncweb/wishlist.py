@@ -0,0 +1,94 @@
+import json, os, shlex
+from pathlib import Path
+
+from syncweb.index import folder_signature
+from syncweb.log_utils import log
+
+WISHLIST = "wishlist.txt"
+BLOCKLIST = "blocklist.txt"
+STATE_KEY = "wishlist"
+
+
+def read_queries(path: Path) -> list[list[str]]:
+    """One `syncweb find` argument list per line; blank lines and # comments are skipped"""
+    if not path.exists():
+        return []
+    queries = []
+    for line in path.read_text().splitlines():
+        line = line.strip()
+        if line and not line.startswith("#"):
+            queries.append(shlex.split(line))
+    return queries
+
+
+class Wishlist:
+    """Find queries kept in the state dir, evaluated incrementally against the file index
+
+    A folder is only searched again once its db/status signature (sequence and global counts) differs from
+    the one it was last evaluated at, and update() returns only matches which were not returned before.
+    The per-folder signatures and matches are persisted in the index's meta table by commit(), once the
+    returned paths were downloaded; until then the same matches are returned again.
+    """
+
+    def __init__(self, st, parse):
+        self.st = st
+        self.parse = parse  # argv -> parsed args with .st set, e.g. automatic.parse_command
+        self.wishlist_path = Path(st.home) / WISHLIST
+        self.blocklist_path = Path(st.home) / BLOCKLIST
+        self.pending: dict | None = None  # evaluated state waiting for commit()
+
+    def exists(self) -> bool:
+        return self.wishlist_path.exists()
+
+    def evaluate(self, queries, folder_ids) -> dict[str, set[str]]:
+        from syncweb.cmds.find import find_results, prepare_find
+
+        matches = {}
+        for query in queries:
+            args = self.parse(["find", *query])
+            prepare_find(args)
+            for folder_id, path in find_results(args, folder_ids):
+                matches.setdefault(folder_id, set()).add(os.path.realpath(path))
+        return matches
+
+    def update(self) -> list[str]:
+        wishes, blocks = read_queries(self.wishlist_path), read_queries(self.blocklist_path)
+        queries = json.dumps([wishes, blocks])
+
+        saved = self.st.index.get_meta(STATE_KEY) or {}
+        state = json.loads(json.dumps(saved))  # a copy to compare against when committing
+        if state.get("queries") != queries:
+            state = {"queries": queries, "folders": {}}  # queries were edited: evaluate everything again
+        evaluated = state["folders"]
+
+        folder_ids = [d["id"] for d in self.st.folders()]
+        signatures = {k: folder_signature(v) for k, v in self.st.gather(self.st.folder_status, folder_ids)}
+        changed = {k for k, v in signatures.items() if evaluated.get(k, {}).get("signature") != v}
+        for folder_id in set(evaluated) - set(signatures):
+            del evaluated[folder_id]
+        self.pending = state if state != saved else None
+        if not changed:
+            self.commit()
+            return []
+
+        log.info("[wishlist] evaluating %d of %d folders", len(changed), len(signatures))
+        wished = self.evaluate(wishes, changed)
+        blocked = self.evaluate(blocks, changed)
+
+        new_paths = []
+        for folder_id in sorted(changed):
+            matches = wished.get(folder_id, set()) - blocked.get(folder_id, set())
+            seen = set(evaluated.get(folder_id, {}).get("matches", []))
+            new_paths.extend(sorted(matches - seen))
+            evaluated[folder_id] = {"signature": signatures[folder_id], "matches": sorted(matches)}
+
+        self.pending = state if state != saved else None
+        if not new_paths:
+            self.commit()
+        return new_paths
+
+    def commit(self):
+        """Persist the state evaluated by update(); call once its new paths were queued for download"""
+        if self.pending is not None:
+            self.st.index.set_meta(STATE_KEY, self.pending)
+            self.pending = None
@@ -0,0 +1,99 @@
+import argparse, time
+
+from syncweb.cmds import automatic
+
+
+def test_run_command_shares_node():
+    st = object()
+    args = argparse.Namespace(st=st)
+
+    seen = automatic.run_command(args, ["sort", "--sort=-niche,size", "/a", "/b"], func=lambda a: a)
+    assert seen.st is st
+    assert seen.sort == ["-niche", "size"]
+    assert seen.paths == ["/a", "/b"]
+
+
+def test_run_command_survives_errors(capsys):
+    def fail(_args):
+        raise RuntimeError("boom")
+
+    def cancel(_args):
+        raise SystemExit(3)
+
+    args = argparse.Namespace(st=None)
+    assert automatic.run_command(args, ["download", "--yes", "/a"], func=fail) is None
+    assert automatic.run_command(args, ["download", "--yes", "/a"], func=cancel) is None
+    err = capsys.readouterr().err
+    assert "download failed: boom" in err
+    assert "download exited with 3" in err
+
+
+def test_succeeds_reports_download_outcome():
+    def exit_with(code):
+        def run():
+            raise SystemExit(code)
+
+        return argparse.Namespace(run=run)
+
+    args = argparse.Namespace(st=None)
+    assert automatic.run_command(args, ["download", "/a"], func=lambda a: automatic.succeeds(exit_with(0)))
+    assert automatic.run_command(args, ["download", "/a"], func=lambda a: automatic.succeeds(exit_with(3))) is None
+
+
+class FakeEventNode:
+    def __init__(self, events):
+        self.queue = events
+
+    def events(self, since=0, limit=None, timeout=60, event_types=None):
+        events = [e for e in self.queue if e["id"] > since and e["type"] in event_types]
+        return events[-limit:] if limit else events
+
+
+def test_wakeups_map_events_to_steps():
+    st = FakeEventNode([{"id": 1, "type": "ItemFinished"}])
+    wakeups = automatic.Wakeups(st)
+    assert wakeups.poll(timeout=0) == []  # starts after the newest event
+
+    st.queue += [{"id": 2, "type": "PendingFoldersChanged"}, {"id": 3, "type": "DeviceDiscovered"}]
+    wakeups.notify(wakeups.poll(timeout=0))
+    assert wakeups.wait(1) == {"folders", "devices"}
+    assert wakeups.since == 3
+
+
+def test_wakeups_ignore_muted_folders():
+    wakeups = automatic.Wakeups(FakeEventNode([]))
+    wakeups.mute({"audio"})
+    wakeups.notify([{"id": 1, "type": "FolderSummary", "data": {"folder": "audio"}}])
+    assert wakeups.wait(0.01) == set()
+
+    wakeups.notify([{"id": 2, "type": "FolderSummary", "data": {"folder": "video"}}])
+    assert wakeups.wait(0.01) == {"files"}
+
+
+def test_wakeups_coalesce_within_min_interval():
+    wakeups = automatic.Wakeups(FakeEventNode([]), min_interval=0.2)
+    wakeups.ran({"files"})
+    wakeups.notify([{"id": 1, "type": "ItemFinished", "data": {"folder": "audio"}}])
+    assert wakeups.wait(0.05) == set()  # too soon after the last run; the timeout run covers it
+
+    wakeups.ran({"files"})
+    wakeups.notify([{"id": 2, "type": "ItemFinished", "data": {"folder": "audio"}}])
+    start = time.monotonic()
+    wakeups.notify([{"id": 3, "type": "PendingDevicesChanged"}])
+    assert wakeups.wait(1) == {"devices"}  # not held back by the files step
+    assert time.monotonic() - start < 0.1
+    assert wakeups.wait(1) == {"files"}
+    assert time.monotonic() - start >= 0.15
+
+
+def test_wakeups_mute_only_files():
+    wakeups = automatic.Wakeups(FakeEventNode([]))
+    wakeups.mute({"audio"})
+    wakeups.notify([{"id": 1, "type": "PendingFoldersChanged", "data": {"folder": "audio"}}])
+    assert wakeups.wait(0.01) == {"folders"}
+
+
+def test_wakeups_wait_times_out():
+    wakeups = automatic.Wakeups(FakeEventNode([]))
+    wakeups.notify([{"id": 1, "type": "ConfigSaved"}])
+    assert wakeups.wait(0.01) == set()
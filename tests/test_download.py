@@ -0,0 +1,228 @@
+from argparse import Namespace
+from collections import deque
+from contextlib import contextmanager
+
+from syncweb.cmds import download
+from syncweb.cmds.download import DownloadScheduler, Prioritizer
+from syncweb.resolver import FolderResolver
+from syncweb.syncthing import SyncthingNode
+
+SIZES = {"a": 40, "b": 40, "c": 40}
+
+
+class FakeMountTable:
+    free = 0
+
+    def device(self, path):
+        return 1
+
+    def usage(self, path, device=None):
+        return Namespace(total=1000, free=FakeMountTable.free)
+
+    def mountpoint(self, path, device=None):
+        return "/mnt"
+
+    def refresh(self):
+        pass
+
+
+class FakeNode:
+    """Downloads one released file per events() long-poll; event IDs are counted per event_types mask"""
+
+    gather = SyncthingNode.gather
+
+    def __init__(self, local=(), stuck=(), failing=()):
+        self.folder_resolver = FolderResolver(
+            [{"id": "f", "path": "/mnt/f", "type": "receiveonly", "minDiskFree": {"value": 0}}]
+        )
+        self.log = []
+        self.downloading = deque()
+        self.batches = []
+        self.history = []
+        self.prio_calls = []
+        self.done = set(local)  # already local: Syncthing never pulls these
+        self.stuck = set(stuck)  # needed but never pulled, e.g. no peer is online
+        self.failing = set(failing)  # the first pull fails, Syncthing retries it
+
+    def folder_status(self, folder_id):
+        return {"needBytes": 0}  # Syncthing has not caught up with the new ignores yet
+
+    @contextmanager
+    def batch_ignores(self):
+        yield
+
+    def add_ignores(self, folder_id, paths):
+        self.batches.append(paths)
+        self.history.append(("release", *paths))
+        self.downloading.extend(paths)
+        self.event("LocalIndexUpdated", filenames=paths)
+
+    def prioritize_file_transfer(self, folder_id, path):
+        self.prio_calls.append(path)
+
+    def event(self, type_, **data):
+        self.log.append({"type": type_, "data": {"folder": "f", **data}})
+
+    def file(self, folder_id, path):
+        local = {"version": ["x:1"]} if path in self.done else {"ignored": path in self.stuck}
+        return {"global": {"version": ["x:1"], "size": SIZES[path]}, "local": local}
+
+    def events(self, since=0, limit=None, timeout=60, event_types=None):
+        if timeout and self.downloading:
+            path = self.downloading.popleft()
+            if path in self.failing:
+                self.failing.discard(path)
+                self.downloading.append(path)
+                self.event("ItemFinished", item=path, error="connection reset")
+            elif path not in self.done | self.stuck:
+                self.done.add(path)
+                self.history.append(("done", path))
+                FakeMountTable.free -= SIZES[path]
+                self.event("ItemFinished", item=path)
+        matching = [e for e in self.log if event_types is None or e["type"] in event_types]
+        events = [dict(e, id=i) for i, e in enumerate(matching, 1) if i > since]
+        return events[-limit:] if limit else events
+
+
+def test_scheduler_releases_within_budget(monkeypatch):
+    monkeypatch.setattr(download, "MountTable", FakeMountTable)
+    FakeMountTable.free = 1000
+    st = FakeNode()
+    scheduler = DownloadScheduler(Namespace(st=st), {"f": list(SIZES.items())}, in_flight_budget=80)
+    assert scheduler.run() == 3
+    assert st.batches == [["a", "b"], ["c"]]
+
+
+def test_scheduler_skips_files_which_can_never_fit(monkeypatch):
+    monkeypatch.setattr(download, "MountTable", FakeMountTable)
+    FakeMountTable.free = 100
+    st = FakeNode()
+    scheduler = DownloadScheduler(Namespace(st=st), {"f": list(SIZES.items())})
+    assert scheduler.run() == 2
+    assert st.batches == [["a", "b"]]
+    assert scheduler.pending() == 0
+
+
+def test_scheduler_drops_released_files_which_never_finish(monkeypatch):
+    monkeypatch.setattr(download, "MountTable", FakeMountTable)
+    FakeMountTable.free = 1000
+    st = FakeNode(local={"a"})
+    scheduler = DownloadScheduler(Namespace(st=st), {"f": list(SIZES.items())}, in_flight_budget=40, timeout=0.05)
+    assert scheduler.run() == 3
+    assert st.batches == [["a"], ["b"], ["c"]]
+
+
+def test_scheduler_gives_up_without_progress(monkeypatch):
+    monkeypatch.setattr(download, "MountTable", FakeMountTable)
+    FakeMountTable.free = 1000
+    st = FakeNode(stuck={"a"})
+    scheduler = DownloadScheduler(
+        Namespace(st=st), {"f": list(SIZES.items())}, in_flight_budget=40, timeout=0.05, stall_timeout=0.1
+    )
+    assert scheduler.run() == 1
+    assert scheduler.pending() == 2
+
+
+def test_scheduler_keeps_failed_files_committed(monkeypatch):
+    monkeypatch.setattr(download, "MountTable", FakeMountTable)
+    FakeMountTable.free = 1000
+    st = FakeNode(failing={"a"})
+    scheduler = DownloadScheduler(Namespace(st=st), {"f": list(SIZES.items())}, in_flight_budget=40)
+    assert scheduler.run() == 3
+    assert st.history[:3] == [("release", "a"), ("done", "a"), ("release", "b")]
+
+
+def test_scheduler_with_prioritizer(monkeypatch):
+    monkeypatch.setattr(download, "MountTable", FakeMountTable)
+    FakeMountTable.free = 1000
+    st = FakeNode()
+    # earlier activity: the ItemFinished-only and PRIO_EVENTS masks number these events differently
+    for path in ["x", "y"]:
+        st.event("LocalIndexUpdated", filenames=[path])
+        st.event("ItemFinished", item=path)
+
+    prioritizer = Prioritizer(st, window=2)
+    scheduler = DownloadScheduler(
+        Namespace(st=st), {"f": list(SIZES.items())}, in_flight_budget=80, prioritizer=prioritizer
+    )
+    assert scheduler.run() == 3
+    assert prioritizer.since == scheduler.since
+    prioritizer.run()
+
+    assert st.batches == [["a", "b"], ["c"]]
+    assert st.history.index(("release", "c")) > st.history.index(("done", "a"))
+    assert set(st.prio_calls) == set(SIZES)
+    assert prioritizer.pending() == 0
+
+
+def test_plan_paths_are_relative_for_folder_roots():
+    from syncweb.index import walk_browse
+
+    class FakePlanNode(FakeNode):
+        def file(self, folder_id, path):
+            return None
+
+        def files_iter(self, folder_id, levels=None, prefix=None):
+            sub = {"name": "sub", "type": "FILE_INFO_TYPE_DIRECTORY", "children": [{"name": "b", "size": 40}]}
+            return walk_browse([{"name": "a", "size": 40}, sub])
+
+    plan = download.build_download_plan(Namespace(st=FakePlanNode(), depth=None), ["/mnt/f"])
+    assert plan == {"f": [("a", 40), ("sub/b", 40)]}
+
+
+class FakePrioNode:
+    """Applies the new ignores on the first events() long-poll, then pulls the front of its queue on each one"""
+
+    gather = SyncthingNode.gather
+
+    def __init__(self, paths, offline=()):
+        self.needed = list(paths)
+        self.ignored = set(self.needed)
+        self.offline = set(offline)  # needed but no peer has them
+        self.pulled = set()
+        self.prio_calls = []
+        self.queue = []
+
+    def prioritize_file_transfer(self, folder_id, path):
+        if path in self.ignored:
+            return  # Syncthing ignores db/prio for files it does not need yet
+        self.prio_calls.append(path)
+        self.needed.remove(path)
+        self.needed.insert(0, path)
+
+    def file(self, folder_id, path):
+        local = {"ignored": True} if path in self.ignored else {"version": [1]} if path in self.pulled else {}
+        return {"global": {"version": [1]}, "local": local}
+
+    def event(self, type_, **data):
+        self.queue.append({"id": len(self.queue) + 1, "type": type_, "data": {"folder": "f", **data}})
+
+    def events(self, since=0, limit=None, timeout=60, event_types=None):
+        if self.ignored:
+            self.ignored.clear()
+            self.event("LocalIndexUpdated", filenames=[])
+        elif self.needed and self.needed[0] not in self.offline:
+            path = self.needed.pop(0)
+            self.pulled.add(path)
+            self.event("ItemFinished", item=path)
+        return [e for e in self.queue if e["id"] > since]
+
+
+def test_prioritizer_pulls_in_plan_order():
+    paths = ["a", "b", "c", "d", "e"]
+    st = FakePrioNode(reversed(paths))
+    prioritizer = Prioritizer(st, window=2)
+    prioritizer.add("f", ["/" + path for path in paths])  # folder-root plans start with a slash
+    prioritizer.run()
+
+    assert [e["data"]["item"] for e in st.queue if e["type"] == "ItemFinished"] == paths
+    assert st.prio_calls[:4] == ["b", "a", "c", "b"]  # each window is sent in reverse once it is not ignored
+    assert prioritizer.pending() == 0
+
+
+def test_prioritizer_gives_up_without_progress():
+    st = FakePrioNode(["a", "b"], offline={"a"})
+    prioritizer = Prioritizer(st, window=2, timeout=0, stall_timeout=0.1)
+    prioritizer.add("f", ["a", "b"])
+    prioritizer.run()
+    assert prioritizer.pending() == 2
@@ -0,0 +1,41 @@
+import os
+
+from syncweb import ensure
+
+
+def fake_syncthing(tmp_path, version="v2.0.10"):
+    exe = tmp_path / "syncthing"
+    exe.write_text(f'#!/bin/sh\necho x >> "{tmp_path}/calls"\necho "syncthing {version} \\"Hafnium Hornet\\""\n')
+    exe.chmod(0o755)
+    return str(exe)
+
+
+def calls(tmp_path):
+    path = tmp_path / "calls"
+    return len(path.read_text().splitlines()) if path.exists() else 0
+
+
+def test_version_probe_is_cached(tmp_path):
+    exe = fake_syncthing(tmp_path)
+
+    assert ensure.cached_probe_version(exe, tmp_path) == "2.0.10"
+    assert ensure.cached_probe_version(exe, tmp_path) == "2.0.10"
+    assert calls(tmp_path) == 1
+
+
+def test_version_probe_reruns_when_binary_changes(tmp_path):
+    exe = fake_syncthing(tmp_path)
+    assert ensure.cached_probe_version(exe, tmp_path) == "2.0.10"
+
+    fake_syncthing(tmp_path, version="v2.1.0")
+    stat = os.stat(exe)
+    os.utime(exe, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert ensure.cached_probe_version(exe, tmp_path) == "2.1.0"
+    assert calls(tmp_path) == 2
+
+
+def test_version_probe_without_cache_dir(tmp_path):
+    exe = fake_syncthing(tmp_path)
+    assert ensure.cached_probe_version(exe) == "2.0.10"
+    assert ensure.cached_probe_version(exe) == "2.0.10"
+    assert calls(tmp_path) == 2
@@ -0,0 +1,102 @@
+from argparse import Namespace
+
+import pytest
+
+from syncweb.cmds.find import compile_name_matcher, find_files
+from syncweb.str_utils import human_to_bytes, parse_human_to_lambda
+
+TREE = [
+    {"name": "Movie.MKV", "type": "FILE_INFO_TYPE_FILE", "size": 2 * 1024**3, "modTime": "2025-01-01T00:00:00Z"},
+    {"name": ".hidden.mkv", "type": "FILE_INFO_TYPE_FILE", "size": 10, "modTime": "2025-01-01T00:00:00Z"},
+    {
+        "name": "shows",
+        "type": "FILE_INFO_TYPE_DIRECTORY",
+        "size": 128,
+        "modTime": "2025-01-01T00:00:00Z",
+        "children": [
+            {
+                "name": "ep1.mkv",
+                "type": "FILE_INFO_TYPE_FILE",
+                "size": 500 * 1024**2,
+                "modTime": "2025-01-01T00:00:00Z",
+            },
+            {"name": "ep1.srt", "type": "FILE_INFO_TYPE_FILE", "size": 100, "modTime": "2025-01-01T00:00:00Z"},
+        ],
+    },
+]
+
+
+def find(**kwargs):
+    args = Namespace(
+        type=None,
+        min_depth=0,
+        max_depth=None,
+        hidden=False,
+        ext=(),
+        sizes=None,
+        time_modified=None,
+        full_path=False,
+        patterns=[".*"],
+        ignore_case=True,
+        fixed_strings=False,
+        glob=False,
+    )
+    for k, v in kwargs.items():
+        setattr(args, k, v)
+    return list(find_files(args, TREE))
+
+
+def test_find_filters():
+    assert find() == ["Movie.MKV", "shows", "shows/ep1.mkv", "shows/ep1.srt"]
+    assert find(type="f", ext=(".mkv",)) == ["Movie.MKV", "shows/ep1.mkv"]
+    assert find(hidden=True, min_depth=0, max_depth=0) == ["Movie.MKV", ".hidden.mkv", "shows"]
+    assert find(sizes=parse_human_to_lambda(human_to_bytes, [">100MB", "-1GB"])) == ["shows", "shows/ep1.mkv"]
+    assert find(patterns=["ep", "srt$"]) == ["shows/ep1.srt"]
+    assert find(patterns=["EP*.SRT"], glob=True) == ["shows/ep1.srt"]
+    assert find(patterns=["movie"], fixed_strings=True) == ["Movie.MKV"]
+    assert find(patterns=["movie"], fixed_strings=True, ignore_case=False) == []
+    assert find(patterns=["shows/.*srt"], full_path=True) == ["shows/ep1.srt"]
+
+
+@pytest.mark.parametrize(
+    "patterns,kwargs,name,expected",
+    [
+        (["a.c"], {}, "xabcx", True),
+        (["a*c"], {"glob": True}, "xabcx", False),
+        (["A*C"], {"glob": True}, "abc", True),
+        (["("], {}, "anything", False),
+    ],
+)
+def test_compile_name_matcher(patterns, kwargs, name, expected):
+    assert compile_name_matcher(patterns, True, **kwargs)(name) is expected
+
+
+def test_parse_human_to_lambda():
+    check = parse_human_to_lambda(human_to_bytes, ["10MB%10"])
+    assert check(10 * 1024**2)
+    assert not check(12 * 1024**2)
+    assert parse_human_to_lambda(human_to_bytes, ["+1KB"])(None) is False
+
+
+def test_find_entries_matches_find_files():
+    from syncweb.cmds.find import find_entries
+    from syncweb.index import walk_browse
+
+    args = Namespace(
+        type=None,
+        min_depth=0,
+        max_depth=None,
+        hidden=False,
+        ext=(".mkv",),
+        sizes=None,
+        time_modified=None,
+        full_path=False,
+        patterns=[".*"],
+        ignore_case=True,
+        fixed_strings=False,
+        glob=False,
+    )
+    assert list(find_entries(args, walk_browse(TREE), None, "x")) == list(find_files(args, TREE, "x"))
+
+    sub = [e for e in walk_browse(TREE) if e[0].startswith("shows/")]
+    assert list(find_entries(args, sub, "shows", "shows", 0)) == ["shows/ep1.mkv"]
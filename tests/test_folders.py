@@ -0,0 +1,55 @@
+from argparse import Namespace
+
+from syncweb.cmds.folders import cmd_list_folders, disk_free
+from syncweb.syncthing import SyncthingNode
+
+
+class FakeNode:
+    gather = SyncthingNode.gather
+    device_id = "LOCAL"
+
+    def __init__(self, tmp_path):
+        self.status_calls = []
+        devices = [{"deviceID": "LOCAL"}]
+        self.config = [
+            {"id": f"f{i}", "label": f"label{i}", "path": str(tmp_path), "type": "sendreceive", "devices": devices}
+            for i in range(3)
+        ]
+
+    def folders(self):
+        return [dict(d) for d in self.config]
+
+    def pending_folders(self):
+        return {}
+
+    def folder_status(self, folder_id):
+        self.status_calls.append(folder_id)
+        return {"state": "idle", "globalBytes": 10, "needBytes": 5}
+
+
+def folder_args(st, **kwargs):
+    args = Namespace(st=st, joined=True, pending=False, discovered=False, local_only=False, introduce=False)
+    args.__dict__.update(include=[], exclude=[], folder_types=[], missing=False, print=False)
+    args.__dict__.update(pause=False, resume=False, delete=False, delete_files=False, join=False)
+    args.__dict__.update(kwargs)
+    return args
+
+
+def test_list_folders_fetches_status_only_when_needed(tmp_path, capsys):
+    st = FakeNode(tmp_path)
+    cmd_list_folders(folder_args(st, include=["label1"]))
+    assert st.status_calls == ["f1"]
+    assert "50% idle" in capsys.readouterr().out
+
+    st.status_calls = []
+    cmd_list_folders(folder_args(st, print=True))
+    assert st.status_calls == []
+    assert capsys.readouterr().out.split() == ["sync://f0#LOCAL", "sync://f1#LOCAL", "sync://f2#LOCAL"]
+
+
+def test_disk_free_per_device(tmp_path):
+    cache = {}
+    (tmp_path / "a").mkdir()
+    assert disk_free(str(tmp_path), cache) == disk_free(str(tmp_path / "a"), cache)
+    assert len(cache) == 1
+    assert disk_free(str(tmp_path / "missing"), cache) is None
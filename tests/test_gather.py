@@ -0,0 +1,91 @@
+import threading, time
+
+import pytest
+
+from syncweb.syncthing import SyncthingNode
+
+
+class FakeNode:
+    gather = SyncthingNode.gather
+
+
+def test_gather_ordered():
+    def slow(i):
+        time.sleep(0.01 * (5 - i % 5))
+        return i * 2
+
+    assert list(FakeNode().gather(slow, range(20))) == [(i, i * 2) for i in range(20)]
+
+
+def test_gather_unordered():
+    results = dict(FakeNode().gather(lambda i: i * 2, range(50), ordered=False))
+    assert results == {i: i * 2 for i in range(50)}
+
+
+def test_gather_bounded():
+    lock = threading.Lock()
+    active = [0, 0]  # current, peak
+
+    def work(i):
+        with lock:
+            active[0] += 1
+            active[1] = max(active[1], active[0])
+        time.sleep(0.005)
+        with lock:
+            active[0] -= 1
+        return i
+
+    assert len(list(FakeNode().gather(work, range(40), max_workers=4))) == 40
+    assert active[1] <= 4
+
+
+def test_gather_lazy_input():
+    consumed = []
+
+    def items():
+        for i in range(1000):
+            consumed.append(i)
+            yield i
+
+    gen = FakeNode().gather(lambda i: i, items(), max_workers=2)
+    assert next(gen) == (0, 0)
+    gen.close()
+    assert len(consumed) < 10
+
+
+def test_gather_raises():
+    def fail(i):
+        if i == 3:
+            raise ValueError(i)
+        return i
+
+    with pytest.raises(ValueError):
+        list(FakeNode().gather(fail, range(10)))
+
+
+class FakeBrowseNode(FakeNode):
+    files_meta = SyncthingNode.files_meta
+
+    def __init__(self):
+        self.calls = []
+
+    def files(self, folder_id, levels=None, prefix=None):
+        self.calls.append(("browse", prefix))
+        return [{"name": f"{i}.txt", "type": "FILE_INFO_TYPE_FILE", "size": i, "modTime": "t"} for i in range(10)]
+
+    def file(self, folder_id, path):
+        self.calls.append(("file", path))
+        if path.endswith("missing"):
+            return None
+        return {"global": {"name": path, "type": "FILE_INFO_TYPE_FILE", "size": 1, "modified": "t"}}
+
+
+def test_files_meta_groups_by_directory():
+    st = FakeBrowseNode()
+    paths = [f"dir/{i}.txt" for i in range(5)] + ["dir/missing", "other/x.txt"]
+    meta = st.files_meta("folder", paths)
+
+    assert meta["dir/3.txt"]["size"] == 3
+    assert meta["other/x.txt"] == {"name": "x.txt", "type": "FILE_INFO_TYPE_FILE", "size": 1, "modTime": "t"}
+    assert meta["dir/missing"] is None
+    assert sorted(st.calls) == [("browse", "dir"), ("file", "dir/missing"), ("file", "other/x.txt")]
@@ -0,0 +1,60 @@
+from syncweb.ignores import IgnoreState, compact_unignores
+
+LISTING = {
+    "shows": {"s1", "s2"},
+    "shows/s1": {"e1.mkv", "e2.mkv"},
+    "shows/s2": {"e1.mkv", "e2.mkv", "e3.mkv"},
+    "movies": {"a.mkv", "b.mkv"},
+}
+
+
+def test_collapse_full_directories():
+    lines = ["!/shows/s1/e1.mkv", "!/shows/s1/e2.mkv", "!/shows/s2/e1.mkv", "!/movies/a.mkv"]
+    assert compact_unignores(lines, LISTING.get) == [
+        "!/movies/a.mkv",
+        "!/shows/s1",
+        "!/shows/s2/e1.mkv",
+    ]
+
+
+def test_collapse_recursively():
+    lines = ["!/shows/s1/e1.mkv", "!/shows/s1/e2.mkv"] + [f"!/shows/s2/e{i}.mkv" for i in (1, 2, 3)]
+    assert compact_unignores(lines, LISTING.get) == ["!/shows"]
+
+
+def test_drop_covered_and_keep_patterns():
+    lines = ["!/movies", "!/movies/a.mkv", "!/movies/sub/", "!*.srt", "!/shows/[ab]*", "!/moviesX"]
+    assert compact_unignores(lines) == ["!/movies", "!/moviesX", "!*.srt", "!/shows/[ab]*"]
+
+
+def test_unknown_listing_is_left_alone():
+    lines = ["!/x/a", "!/x/b"]
+    assert compact_unignores(lines, lambda d: None) == lines
+    assert compact_unignores(lines, lambda d: set()) == lines
+
+
+class FakeNode:
+    def __init__(self, lines):
+        self.lines = lines
+        self.posts = 0
+
+    def set_ignores(self, folder_id, lines):
+        self.lines = lines
+        self.posts += 1
+
+
+def test_ignore_state_skips_unchanged_writes():
+    st = FakeNode(["// Syncweb-managed", "!/movies/a.mkv", "*"])
+    state = IgnoreState("f", st.lines)
+
+    assert state.add(["movies/a.mkv"]) == 0
+    assert not state.flush(st, LISTING.get)
+    assert st.posts == 0
+
+    state.add(["shows/s1/e1.mkv", "shows/s1/e2.mkv", "!/movies/b.mkv"])
+    assert state.flush(st, LISTING.get)
+    assert st.lines == ["// Syncweb-managed", "!/movies", "!/shows/s1", "*"]
+
+    state.add(["movies/a.mkv", "shows/s1/e2.mkv"])  # already covered
+    assert not state.flush(st, LISTING.get)
+    assert st.posts == 1
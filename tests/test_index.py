@@ -0,0 +1,216 @@
+import pytest
+
+from syncweb import index as index_module
+from syncweb.events import EventWatcher
+from syncweb.index import FileIndex, walk_browse
+from syncweb.syncthing import SyncthingNode
+
+BROWSE = [
+    {
+        "name": "Recordings",
+        "modTime": "2025-10-06T20:56:00Z",
+        "size": 128,
+        "type": "FILE_INFO_TYPE_DIRECTORY",
+        "children": [
+            {"name": "a.mka", "modTime": "2025-10-06T20:56:00Z", "size": 10, "type": "FILE_INFO_TYPE_FILE"},
+            {
+                "name": "sub",
+                "modTime": "2025-10-06T20:56:00Z",
+                "size": 128,
+                "type": "FILE_INFO_TYPE_DIRECTORY",
+                "children": [
+                    {"name": "b.mka", "modTime": "2025-10-06T20:56:00Z", "size": 20, "type": "FILE_INFO_TYPE_FILE"}
+                ],
+            },
+        ],
+    },
+    {"name": "empty", "modTime": "2022-07-28T00:00:00Z", "size": 128, "type": "FILE_INFO_TYPE_DIRECTORY"},
+]
+
+
+class FakeNode:
+    gather = SyncthingNode.gather
+
+    def __init__(self):
+        self.browse_calls = 0
+        self.summary = {"sequence": 1, "globalFiles": 2}
+
+    def folder_status(self, folder_id):
+        return self.summary
+
+    def files_iter(self, folder_id):
+        self.browse_calls += 1
+        return walk_browse(BROWSE)
+
+
+def test_roundtrip(tmp_path):
+    index = FileIndex(tmp_path / "index.db")
+    index.rebuild("audio", BROWSE, None)
+
+    assert index.files("audio") == BROWSE
+    assert index.files("audio", prefix="Recordings/") == BROWSE[0]["children"]
+    assert index.files("audio", prefix="Recordings/sub") == BROWSE[0]["children"][1]["children"]
+    assert index.files("audio", prefix="Recordings/sub/b.mka") == []
+
+
+def test_levels(tmp_path):
+    index = FileIndex(tmp_path / "index.db")
+    index.rebuild("audio", BROWSE, None)
+
+    top = index.files("audio", levels=0)
+    assert [d["name"] for d in top] == ["Recordings", "empty"]
+    assert "children" not in top[0]
+
+    children = index.files("audio", prefix="Recordings", levels=0)
+    assert [d["name"] for d in children] == ["a.mka", "sub"]
+    assert "children" not in children[1]
+
+
+def test_refresh_only_when_signature_changes(tmp_path):
+    st = FakeNode()
+    index = FileIndex(tmp_path / "index.db")
+    assert index.refresh(st, "audio")
+    assert st.browse_calls == 1
+
+    index = FileIndex(tmp_path / "index.db")
+    assert not index.refresh(st, "audio")
+    assert st.browse_calls == 1
+
+    st.summary = {"sequence": 2, "globalFiles": 3}
+    index = FileIndex(tmp_path / "index.db")
+    assert index.refresh(st, "audio")
+    assert st.browse_calls == 2
+
+
+def test_num_peers(tmp_path):
+    index = FileIndex(tmp_path / "index.db")
+    index.rebuild("audio", BROWSE, None)
+
+    assert index.file("audio", "Recordings/a.mka")["num_peers"] is None
+    index.set_num_peers("audio", "Recordings/a.mka", 3)
+    assert index.file("audio", "Recordings/a.mka")["num_peers"] == 3
+    assert index.file("audio", "missing") is None
+
+
+class FakeEventNode(FakeNode):
+    def __init__(self, events):
+        super().__init__()
+        self.queue = events
+        self.file_calls = []
+
+    def status(self):
+        return {"startTime": "2025-10-06T20:56:00Z"}
+
+    def events(self, since=0, limit=None, timeout=60, event_types=None):
+        return [e for e in self.queue if e["id"] > since]
+
+    def file(self, folder_id, path):
+        self.file_calls.append(path)
+        if path == "Recordings/a.mka":
+            return {"global": {"deleted": True}}
+        return {"global": {"type": "FILE_INFO_TYPE_FILE", "size": 5, "modified": "2025-10-07T00:00:00Z"}}
+
+
+def test_event_deltas(tmp_path):
+    st = FakeEventNode(
+        [
+            {"id": 1, "type": "LocalIndexUpdated", "data": {"folder": "audio", "filenames": ["Recordings/a.mka"]}},
+            {"id": 2, "type": "RemoteChangeDetected", "data": {"folderID": "audio", "path": "new.txt"}},
+            {"id": 3, "type": "FolderSummary", "data": {"folder": "audio", "summary": {"sequence": 9}}},
+        ]
+    )
+    index = FileIndex(tmp_path / "index.db")
+    watcher = EventWatcher(st, index)
+    index.rebuild("audio", BROWSE, "old")
+    index.set_meta("syncthing_start_time", st.status()["startTime"])
+    index.set_meta("event_types", list(watcher.event_types))
+
+    watcher.catch_up()
+    assert st.file_calls == ["Recordings/a.mka", "new.txt"]
+    assert index.file("audio", "Recordings/a.mka") is None
+    assert index.file("audio", "new.txt")["size"] == 5
+    assert index.get_meta("last_event_id") == 3
+
+    # signature comes from FolderSummary so no db/browse is needed
+    assert not index.refresh(st, "audio")
+    assert st.browse_calls == 0
+
+
+def test_remote_index_update_rebrowses_later(tmp_path, monkeypatch):
+    st = FakeEventNode(
+        [
+            {"id": 1, "type": "RemoteIndexUpdated", "data": {"folder": "audio", "items": 1}},
+            {"id": 2, "type": "FolderSummary", "data": {"folder": "audio", "summary": {"sequence": 9}}},
+        ]
+    )
+    index = FileIndex(tmp_path / "index.db")
+    watcher = EventWatcher(st, index)
+    index.rebuild("audio", BROWSE, "old")
+    index.set_meta("syncthing_start_time", st.status()["startTime"])
+    index.set_meta("event_types", list(watcher.event_types))
+
+    watcher.catch_up()
+    assert index.signature("audio") == "old"  # rows are kept and served until the next browse is due
+    assert not index.refresh(st, "audio")
+    assert st.browse_calls == 0
+    assert len(list(index.entries("audio"))) == 5
+
+    monkeypatch.setattr(index_module, "REBROWSE_INTERVAL", 0)
+    assert index.refresh(st, "audio")
+    assert st.browse_calls == 1
+    assert index.remote_changed() == {}
+
+
+def test_event_gap_invalidates(tmp_path):
+    st = FakeEventNode([{"id": 50, "type": "RemoteIndexUpdated", "data": {"folder": "audio"}}])
+    index = FileIndex(tmp_path / "index.db")
+    watcher = EventWatcher(st, index)
+    index.rebuild("audio", BROWSE, "old")
+    index.set_meta("syncthing_start_time", st.status()["startTime"])
+    index.set_meta("event_types", list(watcher.event_types))
+    index.set_meta("last_event_id", 10)
+
+    watcher.catch_up()
+    assert index.signature("audio") is None
+    assert index.refresh(st, "audio")
+    assert st.browse_calls == 1
+
+
+def test_streamed_browse(tmp_path):
+    import json
+
+    from syncweb.json_stream import iter_browse
+
+    data = json.dumps(BROWSE).encode()
+    for n in (1, 3, 64, len(data)):
+        entries = list(iter_browse(data[i : i + n] for i in range(0, len(data), n)))
+        assert [e[:3] for e in entries] == [e[:3] for e in walk_browse(BROWSE)]
+        assert all("children" not in item for *_, item in entries)
+
+    def interrupted():
+        yield from walk_browse(BROWSE[:1])
+        raise ConnectionError
+
+    index = FileIndex(tmp_path / "index.db")
+    with pytest.raises(ConnectionError):
+        index.rebuild_entries("audio", interrupted(), "sig")
+    assert index.files("audio") == []  # nothing is committed
+
+    assert index.rebuild_entries("audio", iter_browse([data]), "sig") == 5
+    assert index.files("audio") == BROWSE
+    assert [e[0] for e in index.entries("audio", prefix="Recordings", levels=0)] == [
+        "Recordings/a.mka",
+        "Recordings/sub",
+    ]
+
+
+def test_files_meta(tmp_path):
+    index = FileIndex(tmp_path / "index.db")
+    index.rebuild("audio", BROWSE, "sig")
+    index.set_num_peers_many("audio", {"Recordings/a.mka": 2})
+
+    meta = index.files_meta("audio", ["Recordings/a.mka", "/Recordings/sub/b.mka", "missing"])
+    assert meta["Recordings/a.mka"]["num_peers"] == 2
+    assert meta["/Recordings/sub/b.mka"]["size"] == 20
+    assert meta["/Recordings/sub/b.mka"]["num_peers"] is None
+    assert meta["missing"] is None
@@ -0,0 +1,58 @@
+from argparse import Namespace
+
+from syncweb.cmds.ls import annotate, calculate_depth, folder_size, print_directory
+
+
+def tree():
+    return [
+        {"name": "a.txt", "type": "FILE_INFO_TYPE_FILE", "size": 5, "modTime": "2025-01-01T00:00:00Z"},
+        {
+            "name": "dir",
+            "type": "FILE_INFO_TYPE_DIRECTORY",
+            "size": 128,
+            "modTime": "2025-01-01T00:00:00Z",
+            "children": [
+                {"name": "b.txt", "type": "FILE_INFO_TYPE_FILE", "size": 10, "modTime": "2025-01-01T00:00:00Z"},
+                {
+                    "name": "sub",
+                    "type": "FILE_INFO_TYPE_DIRECTORY",
+                    "size": 128,
+                    "modTime": "2025-01-01T00:00:00Z",
+                    "children": [
+                        {"name": "c.txt", "type": "FILE_INFO_TYPE_FILE", "size": 20, "modTime": "2025-01-01T00:00:00Z"}
+                    ],
+                },
+                {"name": "empty", "type": "FILE_INFO_TYPE_DIRECTORY", "size": 128, "children": []},
+            ],
+        },
+    ]
+
+
+def test_annotate():
+    items = tree()
+    annotate(items)
+    a, d = items
+    assert (a["total_size"], a["file_count"], a["max_depth"]) == (5, 1, 0)
+    assert (d["total_size"], d["file_count"], d["max_depth"]) == (30, 2, 2)
+    assert d["children"][2]["total_size"] == 0
+
+    fresh = tree()
+    assert folder_size(fresh[1]) == 30
+    assert calculate_depth(fresh[1]) == 2
+
+
+def test_deep_tree():
+    item = {"name": "leaf", "type": "FILE_INFO_TYPE_FILE", "size": 1}
+    for i in range(5000):  # deeper than the recursion limit
+        item = {"name": str(i), "type": "FILE_INFO_TYPE_DIRECTORY", "children": [item]}
+    assert folder_size(item) == 1
+    assert calculate_depth(item) == 5000
+
+
+def test_print_directory(capsys):
+    args = Namespace(show_all=False, long=True, human_readable=False, depth=2)
+    print_directory(args, tree())
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0].split()[:2] == ["d", "30"]
+    assert lines[0].endswith("dir/")
+    assert [line.strip().split()[-1] for line in lines if line.strip()][2:] == ["sub/", "empty/", "b.txt", "a.txt"]
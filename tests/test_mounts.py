@@ -0,0 +1,32 @@
+import os
+
+from syncweb.mounts import MountTable, parse_mountinfo
+
+MOUNTINFO = """\
+22 1 8:1 / / rw,relatime shared:1 - ext4 /dev/sda1 rw
+36 22 8:17 / /mnt/my\\040disk rw,noatime master:1 - ext4 /dev/sdb1 rw,errors=continue
+37 22 8:17 /media /srv/media rw - ext4 /dev/sdb1 rw
+"""
+
+
+def test_parse_mountinfo():
+    assert parse_mountinfo(MOUNTINFO) == [
+        (os.makedev(8, 1), "/", "ext4"),
+        (os.makedev(8, 17), "/mnt/my disk", "ext4"),
+        (os.makedev(8, 17), "/srv/media", "ext4"),
+    ]
+
+
+def test_mount_table(tmp_path):
+    device = os.stat(tmp_path).st_dev
+    mountinfo = tmp_path / "mountinfo"
+    dev = f"{os.major(device)}:{os.minor(device)}"
+    mountinfo.write_text(f"1 0 {dev} / / rw - ext4 x rw\n2 1 {dev} / {tmp_path} rw - ext4 x rw\n")
+    (tmp_path / "a").mkdir()
+
+    mounts = MountTable(mountinfo)
+    assert mounts.mountpoint(tmp_path / "a") == str(tmp_path)  # deepest bind mount of the device
+    assert mounts.usage(tmp_path / "a") is mounts.usage(tmp_path)  # one statvfs per device
+
+    unlisted = MountTable(tmp_path / "missing")
+    assert os.path.ismount(unlisted.mountpoint(tmp_path / "a"))
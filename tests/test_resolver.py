@@ -0,0 +1,72 @@
+from syncweb.resolver import FolderResolver
+
+
+def test_resolve(tmp_path):
+    (tmp_path / "music" / "live").mkdir(parents=True)
+    (tmp_path / "videos").mkdir()
+    resolver = FolderResolver(
+        [
+            {"id": "music", "path": str(tmp_path / "music"), "type": "sendreceive"},
+            {"id": "live", "path": str(tmp_path / "music" / "live"), "type": "sendonly"},
+            {"id": "videos", "path": str(tmp_path / "videos"), "type": "receiveonly"},
+        ]
+    )
+
+    assert resolver.resolve(tmp_path / "music") == ("music", None)
+    assert resolver.resolve(tmp_path / "music" / "a" / "b.mp3") == ("music", "a/b.mp3")
+    assert resolver.resolve(tmp_path / "music" / "live" / "x.mp3") == ("live", "x.mp3")
+    assert resolver.resolve(tmp_path / "musical") == (None, None)
+    assert resolver.resolve(tmp_path) == (None, None)
+    assert [(f["id"], rel) for f, rel in resolver.containing(tmp_path / "music" / "live" / "x.mp3")] == [
+        ("live", "x.mp3"),
+        ("music", "live/x.mp3"),
+    ]
+
+    assert [(f["id"], rel) for f, rel in resolver.below(tmp_path)] == [
+        ("music", "music"),
+        ("live", "music/live"),
+        ("videos", "videos"),
+    ]
+    assert resolver.below(tmp_path / "videos") == []
+    assert resolver.folder("videos")["type"] == "receiveonly"
+
+
+def test_invalidated_on_config_events(tmp_path):
+    from syncweb.syncweb import Syncweb
+
+    class FakeSyncweb(Syncweb):
+        def __init__(self):
+            self.calls = 0
+
+        def folders(self):
+            self.calls += 1
+            return [{"id": "music", "path": str(tmp_path)}]
+
+    st = FakeSyncweb()
+    for _ in range(3):
+        assert st.folder_resolver.resolve(tmp_path / "a") == ("music", "a")
+    assert st.folder_roots == {str(tmp_path): "music"}
+    assert st.calls == 1
+
+    st.on_events([{"id": 1, "type": "ConfigSaved", "data": {}}])
+    st.folder_resolver.resolve(tmp_path)
+    assert st.calls == 2
+
+
+def test_downloadable_falls_back_to_enclosing_folder(tmp_path):
+    from types import SimpleNamespace
+
+    from syncweb.cmds.find import path2fid_allow_outside
+
+    (tmp_path / "music" / "live").mkdir(parents=True)
+    resolver = FolderResolver(
+        [
+            {"id": "music", "path": str(tmp_path / "music"), "type": "sendreceive"},
+            {"id": "live", "path": str(tmp_path / "music" / "live"), "type": "sendonly"},
+        ]
+    )
+    args = SimpleNamespace(st=SimpleNamespace(folder_resolver=resolver), downloadable=True)
+    assert list(path2fid_allow_outside(args, tmp_path / "music" / "live" / "a")) == [("music", "live/a", "")]
+
+    args.downloadable = False
+    assert list(path2fid_allow_outside(args, tmp_path / "music" / "live" / "a")) == [("live", "a", "")]
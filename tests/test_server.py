@@ -0,0 +1,142 @@
+import argparse, io, socket, sys, threading
+
+from syncweb import log_utils, server
+from syncweb.cli import STDIN_DASH, ArgparseArgsOrStdin, SubParser
+
+
+def create_parser():
+    subparsers = SubParser(argparse.ArgumentParser(prog="syncweb"))
+    subparsers.add_argument("--verbose", "-v", action="count", default=0)
+    sort = subparsers.add_parser("sort", func=lambda args: print(*sorted(args.paths), sep="\n"))
+    sort.add_argument("paths", nargs="*", default=STDIN_DASH, action=ArgparseArgsOrStdin)
+    subparsers.add_parser("fail", func=lambda args: sys.exit(3))
+    subparsers.add_parser("info", func=lambda args: server.log.info("tty=%s", log_utils.in_terminal()))
+    return subparsers
+
+
+def run_handle(argv, stdin="", **request):
+    server_sock, client_sock = socket.socketpair()
+    messages = []
+
+    def client():
+        with client_sock, client_sock.makefile("rwb") as f:
+            server.send(f, argv=argv, cwd=".", **request)
+            while True:
+                message = server.receive(f)
+                messages.append(message)
+                if "stdin" in message:
+                    server.send(f, data=stdin)
+                elif "exit" in message:
+                    return
+
+    t = threading.Thread(target=client)
+    t.start()
+    server.handle(server_sock, st=None, create_parser=create_parser, shutdown=threading.Event())
+    t.join(timeout=5)
+    return messages
+
+
+def test_handle_reads_stdin_on_demand():
+    messages = run_handle(["sort"], stdin="b\na\n")
+    assert messages[0] == {"stdin": "read"}
+    assert "".join(m.get("stdout", "") for m in messages) == "a\nb\n"
+    assert messages[-1] == {"exit": 0}
+
+
+def test_handle_args_do_not_touch_stdin():
+    messages = run_handle(["sort", "z", "y"])
+    assert not any("stdin" in m for m in messages)
+    assert messages[-1] == {"exit": 0}
+
+
+def test_handle_exit_code():
+    assert run_handle(["fail"])[-1] == {"exit": 3}
+
+
+def test_forward(tmp_path, monkeypatch):
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.bind(str(server.socket_path(tmp_path)))
+    sock.listen(1)
+
+    def fake_server():
+        conn, _ = sock.accept()
+        with conn, conn.makefile("rwb") as f:
+            assert server.receive(f)["argv"] == ["ls"]
+            server.send(f, stdin="readline")
+            line = server.receive(f)["data"]
+            server.send(f, stdout=line.upper())
+            server.send(f, exit=0)
+
+    t = threading.Thread(target=fake_server)
+    t.start()
+    stdout = io.StringIO()
+    monkeypatch.setattr(sys, "stdin", io.StringIO("hello\nworld\n"))
+    monkeypatch.setattr(sys, "stdout", stdout)
+    assert server.forward(tmp_path, ["ls"]) == 0
+    t.join(timeout=5)
+    sock.close()
+    assert stdout.getvalue() == "HELLO\n"
+
+
+def test_forward_without_server(tmp_path):
+    assert server.forward(tmp_path, ["ls"]) is None
+
+
+def test_command_index_skips_option_values():
+    subparsers = create_parser()
+    subparsers.add_argument("--home")
+    assert subparsers.command_index(["--home", "/x", "sort"]) == 2
+    assert subparsers.command_index(["-vv", "--home=/x", "sort", "a"]) == 2
+    assert subparsers.command_index(["--home", "/x"]) is None
+
+
+def test_forward_local_only_after_option_value(tmp_path, monkeypatch):
+    from syncweb.__main__ import create_parser, forward_to_server
+
+    subparsers = create_parser()
+    monkeypatch.setattr(server, "forward", lambda home, argv: (home, argv))
+    assert forward_to_server(subparsers, ["--home", str(tmp_path), "automatic"]) is None
+    assert forward_to_server(subparsers, ["--home", str(tmp_path), "download", "--schedule", "a"]) is None
+    assert forward_to_server(subparsers, ["dl", "--prioritize=5", "a"]) is None
+    assert forward_to_server(subparsers, ["--home", str(tmp_path), "download", "a"]) is not None
+    argv = ["--home", str(tmp_path), "ls"]
+    assert forward_to_server(subparsers, argv) == (tmp_path, argv)
+
+
+def test_handle_forwards_log_output():
+    def create_log_parser():
+        subparsers = SubParser(argparse.ArgumentParser(prog="syncweb"))
+        subparsers.add_parser("warn", func=lambda args: server.log.warning("disk is full"))
+        return subparsers
+
+    server_sock, client_sock = socket.socketpair()
+    with client_sock, client_sock.makefile("rwb") as f:
+        server.send(f, argv=["warn"], cwd=".")
+        server.handle(server_sock, st=None, create_parser=create_log_parser, shutdown=threading.Event())
+        messages = [server.receive(f), server.receive(f)]
+    assert {"stderr": "disk is full\n"} in messages
+
+
+def test_handle_applies_client_verbosity_and_tty():
+    assert not any("stderr" in m for m in run_handle(["info"]))
+    messages = run_handle(["-v", "info"], is_terminal=True)
+    assert {"stderr": "tty=True\n"} in messages
+    assert log_utils.in_terminal() == log_utils.is_terminal  # the server's own state is untouched
+
+
+def test_handle_connections_concurrently():
+    slow_sock, slow_client = socket.socketpair()
+    with server.client_streams(), slow_client, slow_client.makefile("rwb") as slow:
+        server.send(slow, argv=["sort"], cwd=".")
+        t = threading.Thread(
+            target=server.handle, args=(slow_sock, None, create_parser, threading.Event()), daemon=True
+        )
+        t.start()
+        assert server.receive(slow) == {"stdin": "read"}  # blocked on its client
+
+        assert run_handle(["sort", "b", "a"])[-1] == {"exit": 0}
+
+        server.send(slow, data="z\n")
+        assert server.receive(slow) == {"stdout": "z\n"}
+        assert server.receive(slow) == {"exit": 0}
+        t.join(timeout=5)
@@ -0,0 +1,92 @@
+import random
+from argparse import Namespace
+from statistics import median
+
+import pytest
+
+from syncweb.cmds.sort import P2Median, aggregate_folders, make_sort_key, select_budget, vectorized_order
+
+
+def naive_budget(records, sort_key, budget):
+    selected = []
+    size_used = 0
+    for record in sorted(records, key=sort_key):
+        if size_used + record["size"] > budget:
+            break
+        size_used += record["size"]
+        selected.append(record)
+    return selected
+
+
+def test_select_budget_matches_full_sort():
+    rng = random.Random(0)
+    records = [{"path": str(i), "size": rng.randint(0, 100), "num_peers": rng.randint(0, 5)} for i in range(2000)]
+
+    def sort_key(d):
+        return (-d["num_peers"], d["size"])
+
+    for budget in (0, 1, 50, 1000, 10**9):
+        assert select_budget(iter(records), sort_key, budget) == naive_budget(records, sort_key, budget)
+
+
+def test_random_key_is_stable_per_path():
+    sort_key = make_sort_key(Namespace(sort=["random"]), {})
+    records = [{"path": str(i)} for i in range(1000)]
+    keys = [sort_key(d) for d in records]
+    assert keys == [sort_key({"path": str(i)}) for i in range(1000)]  # new dicts, same paths
+    assert len(set(keys)) == len(keys)
+
+
+@pytest.mark.parametrize("modes", [["-niche", "-frecency"], ["size", "-time"], ["-folder-size", "week", "peers"]])
+def test_vectorized_order_matches_sort_key(modes):
+    pytest.importorskip("numpy")
+    rng = random.Random(1)
+    data = [
+        {
+            "path": f"/d{rng.randint(0, 30)}/{i}",
+            "size": rng.randint(0, 10**10),
+            "num_peers": rng.randint(0, 5),
+            "modified": rng.randint(1_500_000_000, 1_700_000_000),
+        }
+        for i in range(3000)
+    ]
+    data.append({"path": "other", "size": 1, "num_peers": 0, "modified": 0})  # no folder aggregate
+    args = Namespace(sort=modes, niche=3, frecency_weight=3)
+    aggregates = aggregate_folders(data, ["modified_median", "size_median", "size_sum"])
+
+    expected = sorted(data, key=make_sort_key(args, aggregates))
+    assert [data[i] for i in vectorized_order(args, data, aggregates)] == expected
+
+
+def test_p2_median():
+    rng = random.Random(2)
+    values = [rng.lognormvariate(10, 1) for _ in range(20000)]
+    estimate = P2Median()
+    for v in values:
+        estimate.add(v)
+    assert abs(estimate.value() - median(values)) / median(values) < 0.02
+
+    small = P2Median()
+    for v in (5, 1, 4, 2):
+        small.add(v)
+    assert small.value() == 3  # exact below six values
+
+
+def test_aggregate_folders_streaming():
+    records = [{"path": f"/a/b/{i}", "size": i, "modified": 100 + i} for i in range(1, 6)]
+    records += [{"path": "/a/c", "size": 10}, {"path": "/a/d", "size": "?"}]
+    specs = ["size_sum", "size_median", "modified_max", "size_mean"]
+
+    aggregates = aggregate_folders(records, specs, 0, 2)
+    assert aggregates["/a/b"] == {
+        "file_count": 5,
+        "size_sum": 15,
+        "size_median": 3,
+        "modified_max": 105,
+        "size_mean": 3,
+    }
+    assert aggregates["/a"]["file_count"] == aggregates["/"]["file_count"] == 6
+    assert aggregates["/a"]["size_mean"] == 25 / 6
+    assert 3 <= aggregates["/a"]["size_median"] <= 4  # estimated from the sixth value on
+
+    assert aggregate_folders(records, specs, 0, 2, exact=True)["/a"]["size_median"] == 3.5
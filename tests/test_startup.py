@@ -0,0 +1,33 @@
+import os, subprocess, sys
+
+import pytest
+
+IMPORT_BUDGET_MS = os.getenv("SYNCWEB_IMPORT_BUDGET_MS")  # wall-clock check, opt-in: too noisy on shared CI
+HEAVY_MODULES = ["IPython", "requests", "tabulate", "humanize", "idna", "sqlite3"]
+
+
+def import_times(module: str) -> dict[str, int]:
+    r = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"], capture_output=True, text=True, check=True
+    )
+
+    cumulative = {}
+    for line in r.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _self_us, cumulative_us, name = line.removeprefix("import time:").split("|")
+        if cumulative_us.strip().isdigit():
+            cumulative[name.strip()] = int(cumulative_us)
+    return cumulative
+
+
+@pytest.mark.skipif(not IMPORT_BUDGET_MS, reason="set SYNCWEB_IMPORT_BUDGET_MS to check import time")
+def test_cli_import_budget():
+    # best of three to smooth out cold disk caches
+    elapsed_ms = min(import_times("syncweb.__main__")["syncweb.__main__"] for _ in range(3)) / 1000
+    assert elapsed_ms < int(IMPORT_BUDGET_MS), f"importing syncweb.__main__ took {elapsed_ms:.0f}ms"
+
+
+@pytest.mark.parametrize("module", HEAVY_MODULES)
+def test_cli_does_not_import_heavy_modules(module):
+    assert module not in import_times("syncweb.__main__")
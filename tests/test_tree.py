@@ -0,0 +1,67 @@
+import sys
+
+from syncweb.cmds.download import collect_files
+from syncweb.cmds.ls import folder_size, print_directory
+from syncweb.cmds.sort import aggregate_folders
+from syncweb.index import walk_browse
+from syncweb.tree import CompactTree
+from tests.test_find import TREE
+from tests.test_ls import tree
+
+
+def test_nodes_match_items():
+    items = tree()
+    t = CompactTree.from_items(items)
+    assert len(t) == len(list(walk_browse(items)))
+
+    nodes = t.top()
+    assert [n["name"] for n in nodes] == ["a.txt", "dir"]
+    assert "children" in nodes[1] and "children" not in nodes[0]
+    assert [c["name"] for c in nodes[1]["children"]] == ["b.txt", "sub", "empty"]
+    assert nodes[1]["children"][1]["children"][0]["path"] == "dir/sub/c.txt"
+    assert nodes[0]["modTime"] == "2025-01-01T00:00:00Z"
+    assert folder_size(nodes[1]) == folder_size(items[1]) == 30
+    assert nodes[1]["file_count"] == 2 and nodes[1]["max_depth"] == 2
+    assert nodes[1]["children"][2]["children"] == [] and folder_size(nodes[1]["children"][2]) == 0
+
+
+def test_empty_directories_from_entries():
+    # like the index: directories never have a children key
+    entries = [
+        (path, parent, depth, {k: v for k, v in item.items() if k != "children"})
+        for path, parent, depth, item in walk_browse(tree())
+    ]
+
+    listed = CompactTree.from_entries(entries, listed_depth=float("inf")).top()
+    assert folder_size(listed[1]) == 30
+    assert "children" in listed[1]["children"][2]
+
+    # "empty" is at depth 1, beyond the listed levels: its children are unknown and its own size is used
+    cut_off = CompactTree.from_entries(entries, listed_depth=1).top()
+    assert folder_size(cut_off[1]) == 30 + 128
+    assert "children" not in cut_off[1]["children"][2]
+
+
+def test_consumers(capsys, tmp_path):
+    args = type("Args", (), {"show_all": False, "long": True, "human_readable": False, "depth": 3})
+    print_directory(args, tree())
+    expected = capsys.readouterr().out
+    print_directory(args, CompactTree.from_items(tree()).top())
+    assert capsys.readouterr().out == expected
+
+    t = CompactTree.from_items(TREE)
+    assert list(collect_files(None, t.top())) == list(collect_files(None, TREE))
+
+    records = [{"path": e[0], "size": e[3]["size"]} for e in walk_browse(TREE) if "children" not in e[3]]
+    assert aggregate_folders(t.files(), ["size_sum"]) == aggregate_folders(records, ["size_sum"])
+
+
+def test_compact():
+    items = [
+        {"name": f"file{i:07d}.mkv", "type": "FILE_INFO_TYPE_FILE", "size": i, "modTime": "2025-01-01T00:00:00Z"}
+        for i in range(10000)
+    ]
+    t = CompactTree.from_items(items)
+    arrays = [t.name_data, t.name_offsets, t.types, t.sizes, t.mtimes, t.parents, t.first_child, t.next_sibling]
+    per_entry = sum(sys.getsizeof(a) for a in arrays) / len(t)
+    assert per_entry < 80  # vs several hundred bytes for a dict per entry
@@ -0,0 +1,67 @@
+import argparse
+
+from syncweb.cmds.automatic import parse_command
+from syncweb.index import FileIndex, walk_browse
+from syncweb.resolver import FolderResolver
+from syncweb.syncthing import SyncthingNode
+from syncweb.wishlist import Wishlist
+
+
+def file(name):
+    return {"name": name, "type": "FILE_INFO_TYPE_FILE", "size": 1, "modTime": "2025-01-01T00:00:00Z"}
+
+
+class FakeNode:
+    gather = SyncthingNode.gather
+
+    def __init__(self, home):
+        self.home = home
+        self.index = FileIndex(home / "index.db")
+        self.config = [{"id": "media", "path": str(home / "media"), "type": "sendreceive"}]
+        self.folder_resolver = FolderResolver(self.config)
+        self.trees = {"media": [file("a.mkv"), file("b.mkv"), file("c.txt")]}
+        self.sequence = 1
+        self.searched = []
+
+    def folders(self):
+        return self.config
+
+    def folder_status(self, folder_id):
+        return {"sequence": self.sequence}
+
+    def indexed_entries(self, folder_id, levels=None, prefix=None):
+        self.searched.append(folder_id)
+        return walk_browse(self.trees[folder_id])
+
+
+def test_wishlist_returns_only_new_matches(tmp_path):
+    st = FakeNode(tmp_path)
+    media = tmp_path / "media"
+    (tmp_path / "wishlist.txt").write_text(f"# movies\n'\\.mkv$' {media}\n")
+    (tmp_path / "blocklist.txt").write_text(f"-F b.mkv {media}\n")
+    wishlist = Wishlist(st, lambda argv: parse_command(argparse.Namespace(st=st), argv))
+
+    assert wishlist.update() == [str(media / "a.mkv")]
+    assert wishlist.update() == [str(media / "a.mkv")]  # not committed: the download may have failed
+    wishlist.commit()
+    assert wishlist.update() == []  # folder unchanged: not searched again
+    assert st.searched == ["media", "media"] * 2
+
+    st.trees["media"].append(file("d.mkv"))
+    st.sequence = 2
+    assert Wishlist(st, wishlist.parse).update() == [str(media / "d.mkv")]  # state persisted in the index
+
+
+def test_wishlist_writes_state_only_on_change(tmp_path):
+    st = FakeNode(tmp_path)
+    (tmp_path / "wishlist.txt").write_text(f"'\\.mkv$' {tmp_path / 'media'}\n")
+    wishlist = Wishlist(st, lambda argv: parse_command(argparse.Namespace(st=st), argv))
+    wishlist.update()
+    wishlist.commit()
+
+    writes = []
+    set_meta = st.index.set_meta
+    st.index.set_meta = lambda key, value: writes.append(key) or set_meta(key, value)
+    assert wishlist.update() == []
+    wishlist.commit()
+    assert writes == []